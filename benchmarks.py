@@ -0,0 +1,332 @@
+"""Micro-benchmarks for the Digital Krishi Officer pipeline.
+
+Run with:
+    python benchmarks.py cv-postprocess --boxes 300
+    python benchmarks.py retrieval --snapshot ./data/knowledge_snapshot [--queries labelled.jsonl]
+    python benchmarks.py quantization --snapshot ./data/knowledge_snapshot
+    python benchmarks.py normalize --chars 20000 --variants 500
+    python benchmarks.py safety --answers 2000
+    python benchmarks.py llm-ttft --model ./models/llama2-7b-kerala-agri --prompts 20
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Any, Callable
+
+import numpy as np
+import torch
+
+from dosage_extractor import extract_dosages
+from fastapi_backend import (
+    CVProcessor, HuggingFaceEmbeddings, LLMProcessor, SafetyValidator, llm_device, load_safety_rules, settings,
+    stage_pools
+)
+from knowledge_index import LocalVectorIndex, bm25_is_confident, reciprocal_rank_fusion, write_snapshot
+from malayalam_normalizer import MalayalamNormalizer
+
+
+def measure(func: Callable, repeat: int, warmup: int = 3) -> Dict[str, float]:
+    """Time func over repeat runs and return latency stats in milliseconds"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return latency_stats(timings)
+
+
+def latency_stats(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def report(name: str, stats: Dict[str, float]):
+    print(f"{name:<28} mean {stats['mean_ms']:9.3f} ms   p50 {stats['p50_ms']:9.3f} ms   "
+          f"p95 {stats['p95_ms']:9.3f} ms")
+
+
+# CV post-processing
+class _Boxes:
+    """Minimal stand-in for an ultralytics Boxes object"""
+
+    def __init__(self, conf: torch.Tensor, cls: torch.Tensor, xyxy: torch.Tensor):
+        self.conf = conf
+        self.cls = cls
+        self.xyxy = xyxy
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _Boxes(self.conf[i:i + 1], self.cls[i:i + 1], self.xyxy[i:i + 1])
+
+
+class _Result:
+    def __init__(self, boxes: _Boxes):
+        self.boxes = boxes
+
+
+def summarize_per_box(processor: CVProcessor, detection) -> Dict[str, Any]:
+    """Previous post-processing: three device-to-host copies per box"""
+    detections = []
+    for box in detection.boxes:
+        conf = float(box.conf.cpu().numpy().item())
+        cls_id = int(box.cls.cpu().numpy().item())
+
+        if conf > 0.5:
+            detections.append({
+                "disease": processor.disease_classes[cls_id],
+                "confidence": conf,
+                "bbox": box.xyxy.cpu().numpy().tolist()
+            })
+
+    if detections:
+        best_detection = max(detections, key=lambda x: x["confidence"])
+        return {
+            "detected_disease": best_detection["disease"],
+            "confidence": best_detection["confidence"],
+            "all_detections": detections
+        }
+    return {"detected_disease": "healthy", "confidence": 0.6, "all_detections": []}
+
+
+def bench_cv_postprocess(args):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    processor = CVProcessor(None, stage_pools["cv"])
+
+    generator = torch.Generator().manual_seed(0)
+    conf = torch.rand(args.boxes, generator=generator)
+    cls = torch.randint(0, len(processor.disease_classes), (args.boxes,), generator=generator).float()
+    xyxy = torch.rand(args.boxes, 4, generator=generator) * 640
+    result = _Result(_Boxes(conf.to(device), cls.to(device), xyxy.to(device)))
+
+    assert processor._summarize(result) == summarize_per_box(processor, result)
+
+    print(f"YOLO post-processing, {args.boxes} candidate boxes on {device}")
+    report("per-box loop", measure(lambda: summarize_per_box(processor, result), args.repeat))
+    report("vectorized", measure(lambda: processor._summarize(result), args.repeat))
+
+
+# Retrieval
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Labelled queries, one JSON object per line: {"query": ..., "relevant": [chunk text, ...]}"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def sample_queries(index: LocalVectorIndex, count: int, words: int = 12) -> List[Dict[str, Any]]:
+    """Known-item queries: the opening words of random chunks, each relevant to its own chunk"""
+    rows = random.Random(0).sample(range(len(index.documents)), min(count, len(index.documents)))
+    return [
+        {"query": " ".join(index.document(row)["text"].split()[:words]), "relevant": [index.document(row)["text"]]}
+        for row in rows
+    ]
+
+
+def bench_retrieval(args):
+    index = LocalVectorIndex(args.snapshot)
+    embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    queries = load_queries(args.queries) if args.queries else sample_queries(index, args.sample)
+    candidates = args.k * settings.RAG_RERANK_FACTOR
+
+    def dense(query: str) -> List[int]:
+        vector = embeddings.embed_query(query)
+        return [row for row, _ in index.search(vector, candidates, settings.LOCAL_INDEX_NPROBE)]
+
+    def sparse(query: str) -> List[int]:
+        return [row for row, _ in index.sparse_search(query, candidates)]
+
+    skipped = 0
+
+    def hybrid(query: str) -> List[int]:
+        nonlocal skipped
+        hits = index.sparse_search(query, candidates)
+        if bm25_is_confident(hits, settings.BM25_CONFIDENT_SCORE, settings.BM25_CONFIDENT_MARGIN):
+            skipped += 1
+            return [row for row, _ in hits]
+        return reciprocal_rank_fusion([dense(query), [row for row, _ in hits]], k=settings.RRF_K)
+
+    print(f"Retrieval over {len(index.documents)} chunks, {len(queries)} queries, recall@{args.k}")
+    for mode, retrieve in (("dense-only", dense), ("sparse-only", sparse), ("hybrid", hybrid)):
+        timings, recalls = [], []
+        for item in queries:
+            start = time.perf_counter()
+            rows = retrieve(item["query"])[:args.k]
+            timings.append((time.perf_counter() - start) * 1000)
+
+            found = {index.document(row)["text"] for row in rows}
+            relevant = set(item["relevant"])
+            recalls.append(len(found & relevant) / len(relevant) if relevant else 0.0)
+
+        report(f"{mode} recall {statistics.mean(recalls):.3f}", latency_stats(timings))
+    print(f"hybrid skipped the embedding for {skipped}/{len(queries)} queries")
+
+
+# Quantized vector search
+def bench_quantization(args):
+    index = LocalVectorIndex(args.snapshot)
+    vectors = np.asarray(index.vectors)
+    nlist = len(index.list_offsets) - 1
+
+    # Queries near stored chunks; exact flat float search is the ground truth
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), min(args.sample, len(vectors)), replace=False)
+    queries = vectors[rows] + rng.normal(scale=0.02, size=(len(rows), vectors.shape[1])).astype(np.float32)
+    exact = [{row for row, _ in index.search(query, args.k, nprobe=nlist)} for query in queries]
+
+    def run(name: str, snapshot: LocalVectorIndex, rescore: int, code_bytes: int):
+        timings, recalls = [], []
+        for query, truth in zip(queries, exact):
+            start = time.perf_counter()
+            hits = snapshot.search(query, args.k, settings.LOCAL_INDEX_NPROBE, rescore=rescore)
+            timings.append((time.perf_counter() - start) * 1000)
+            found = {snapshot.document(row).get("benchmark_row", row) for row, _ in hits}
+            recalls.append(len(found & truth) / len(truth))
+        report(f"{name} recall {statistics.mean(recalls):.3f}", latency_stats(timings))
+        print(f"{'':<28} scanned vectors {code_bytes / 2 ** 20:.1f} MiB")
+
+    factor = settings.LOCAL_INDEX_RESCORE_FACTOR
+    print(f"{len(vectors)} x {vectors.shape[1]} vectors, {len(queries)} queries, recall@{args.k} "
+          f"against exact float search, nprobe {settings.LOCAL_INDEX_NPROBE}")
+    run("float32", index, 0, vectors.nbytes)
+
+    # Rebuilding re-trains IVF and reorders rows, so carry each row's original number along
+    documents = [{**index.document(row), "benchmark_row": row} for row in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as workdir:
+        for quantization, rescores in (("int8", (0, factor)), ("binary", (0, factor, 4 * factor))):
+            path = os.path.join(workdir, quantization)
+            write_snapshot(path, vectors, documents, index.manifest["collection"], nlist=nlist,
+                           quantization=quantization)
+            snapshot = LocalVectorIndex(path)
+            for rescore in rescores:
+                label = f"{quantization} rescore x{rescore}" if rescore else f"{quantization} codes only"
+                run(label, snapshot, rescore, snapshot.codes.nbytes)
+
+
+# Malayalam normalization
+def normalize_per_entry(variants: Dict[str, str], text: str) -> str:
+    """Previous normalization: one full-string replace per table entry"""
+    for old, new in variants.items():
+        text = text.replace(old, new)
+    return text.strip()
+
+
+def bench_normalize(args):
+    with open(settings.MALAYALAM_NORMALIZATION_PATH, "r", encoding="utf-8") as f:
+        variants = json.load(f)["variants"]
+
+    # Pad the table with synthetic variants to the requested size, as a growing table would be
+    rng = random.Random(0)
+    letters = [chr(code) for code in range(0x0d15, 0x0d39)]
+    while len(variants) < args.variants:
+        stem = "".join(rng.choice(letters) for _ in range(rng.randint(3, 6)))
+        variants[stem + "\u0d3f\u0d28\u0d4d"] = stem + "\u0d4d"
+
+    sentences = ["എന്റെ നെല്ലിന് ബ്ലാസ്റ്റ് രോഗം ഉണ്ട്", "തെങ്ങിന് ഏത് വളം ഇടണം",
+                 "കുരുമുളകിന് വാട്ടം വന്നു", "ഈ മാസം റബ്ബറിന് എന്ത് ചെയ്യണം"]
+    transcript = ""
+    while len(transcript) < args.chars:
+        transcript += rng.choice(sentences) + ". "
+
+    normalizer = MalayalamNormalizer(variants)
+    print(f"Malayalam normalization, {len(transcript)}-character transcript, {len(variants)} table entries")
+    report("per-entry replace", measure(lambda: normalize_per_entry(variants, transcript), args.repeat))
+    report("compiled single pass", measure(lambda: normalizer.normalize(transcript), args.repeat))
+
+
+# Safety validation
+SAFETY_SENTENCES = [
+    "നെൽ ബ്ലാസ്റ്റ് രോഗത്തിന് കാർബെൻഡാസിം 0.1% സ്പ്രേ ചെയ്യുക.",
+    "വാരത്തിൽ രണ്ടു തവണ പ്രയോഗിക്കുക.",
+    "ഒരു ലിറ്റർ വെള്ളത്തിൽ 3 ഗ്രാം മാങ്കോസെബ് കലക്കി തളിക്കുക.",
+    "വെള്ളം നിൽക്കാതിരിക്കാൻ ശ്രദ്ധിക്കുക.",
+    "Spray Copper oxychloride 0.3% on the leaves and repeat twice.",
+    "Apply potash 25 kg per acre before the monsoon.",
+    "കൂടുതൽ വിവരങ്ങൾക്ക് കൃഷിഭവൻ ഉദ്യോഗസ്ഥനെ സമീപിക്കുക.",
+]
+
+
+def bench_safety(args):
+    validator = SafetyValidator(load_safety_rules(settings.SAFETY_RULES_PATH))
+
+    rng = random.Random(0)
+    answers = [" ".join(rng.choices(SAFETY_SENTENCES, k=rng.randint(2, 6))) for _ in range(args.answers)]
+    characters = sum(len(answer) for answer in answers)
+
+    print(f"Safety validation, {len(answers)} answers, {characters / len(answers):.0f} characters on average")
+    for name, func in [
+        ("dosage extraction", lambda: [extract_dosages(answer) for answer in answers]),
+        ("validate_response", lambda: [validator.validate_response(answer, {}) for answer in answers]),
+    ]:
+        stats = measure(func, args.repeat, warmup=1)
+        print(f"{name:<28} {len(answers) / stats['mean_ms'] * 1000:9.0f} answers/s   "
+              f"{characters / stats['mean_ms'] / 1000:6.1f} M chars/s   "
+              f"p95 batch {stats['p95_ms']:.1f} ms")
+
+
+# LLM time to first token
+def bench_llm_ttft(args):
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model).to(llm_device()).eval()
+    processor = LLMProcessor(tokenizer, model, stage_pools["llm"])
+
+    rng = random.Random(0)
+    queries = ["നെല്ലിന് ബ്ലാസ്റ്റ് രോഗം വന്നാൽ എന്ത് ചെയ്യണം?", "തെങ്ങിന്റെ ഓല മഞ്ഞളിക്കുന്നു",
+               "കുരുമുളകിന് വാട്ടം വന്നു", "വാഴയ്ക്ക് ഏത് വളം ഇടണം?"]
+    prompts = [
+        processor.build_prompt(rng.choice(queries), rng.sample(SAFETY_SENTENCES, 3), "Thrissur")
+        for _ in range(args.prompts)
+    ]
+    print(f"LLM time to first token on {llm_device()}, {len(prompts)} prompts, "
+          f"{processor.prefix_ids.shape[1]}-token preamble")
+    for name, use_prefix_cache in [("full prompt", False), ("prefix KV cache", True)]:
+        # The first call also builds the prefix cache
+        processor.generate(prompts[0], 1, use_prefix_cache)
+        timings = [processor.generate(prompt, 1, use_prefix_cache)[1] * 1000 for prompt in prompts]
+        report(name, latency_stats(timings))
+
+
+BENCHMARKS = {
+    "cv-postprocess": bench_cv_postprocess,
+    "retrieval": bench_retrieval,
+    "quantization": bench_quantization,
+    "normalize": bench_normalize,
+    "safety": bench_safety,
+    "llm-ttft": bench_llm_ttft,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--boxes", type=int, default=300, help="cv-postprocess: candidate boxes per image")
+    parser.add_argument("--snapshot", default=settings.LOCAL_INDEX_PATH,
+                        help="retrieval, quantization: local index snapshot")
+    parser.add_argument("--queries", help="retrieval: labelled queries JSONL (default: sampled known-item queries)")
+    parser.add_argument("--sample", type=int, default=500, help="retrieval, quantization: sampled queries")
+    parser.add_argument("--k", type=int, default=5, help="retrieval, quantization: results per query")
+    parser.add_argument("--chars", type=int, default=20000, help="normalize: transcript length")
+    parser.add_argument("--variants", type=int, default=500, help="normalize: normalization table size")
+    parser.add_argument("--answers", type=int, default=2000, help="safety: answers validated per run")
+    parser.add_argument("--model", default=settings.LLM_MODEL_PATH, help="llm-ttft: causal LM to load")
+    parser.add_argument("--prompts", type=int, default=20, help="llm-ttft: prompts timed per mode")
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args)
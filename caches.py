@@ -0,0 +1,290 @@
+"""Answer caches shared by the API and the offline jobs that invalidate them.
+
+AnswerCache is the exact-match tier (in-process LRU in front of Redis);
+SemanticCache catches rewordings of cached questions. Importing this module
+only sets up the Redis connection pool.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import redis.asyncio as aioredis
+from prometheus_client import Counter, Histogram
+
+from config import settings
+
+# Redis setup: one asyncio pool per worker, shared by OTP, caching and any other Redis users.
+# Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of opening unbounded ones.
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    decode_responses=True
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+ANSWER_CACHE_REQUESTS = Counter("answer_cache_requests_total", "Answer cache lookups", ["tier", "result"])
+SEMANTIC_CACHE_REQUESTS = Counter("semantic_cache_requests_total", "Semantic cache lookups", ["result"])
+SEMANTIC_CACHE_SIMILARITY = Histogram("semantic_cache_similarity", "Best cosine similarity found per lookup",
+                                      buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.95, 0.98, 1.0))
+
+
+class AnswerCache:
+    """Exact-match cache of pipeline answers for repeated farmer questions.
+
+    Keys combine the normalized query text, detected intent and entities,
+    language, district and safety rules version. Entries live in a small
+    in-process LRU in front of Redis, with a TTL chosen per intent. Bumping
+    the Redis generation counter (after a knowledge base change) orphans
+    every existing entry on all replicas.
+
+    Entries are also indexed by the knowledge_base sources their answer
+    cited, so a re-indexed or deleted source invalidates only the answers
+    built on it. Those invalidations reach other replicas' local tiers
+    through a Redis stream read together with the generation counter.
+    """
+
+    GENERATION_KEY = "answer_cache:generation"
+    INVALIDATION_STREAM = "answer_cache:invalidated"
+    INVALIDATION_STREAM_LENGTH = 10000
+    # How long a worker trusts its copy of the generation counter
+    GENERATION_REFRESH_SECONDS = 5.0
+    PUNCTUATION = re.compile(r"[?!.,;:\"'()\[\]\-।]+")
+
+    def __init__(self, client):
+        self.client = client
+        self.local: OrderedDict = OrderedDict()
+        self.generation = "0"
+        self.generation_checked = 0.0
+        # Last invalidation stream entry applied to the local tier; older entries predate this process
+        self.invalidation_cursor = f"{int(time.time() * 1000)}-0"
+        # Other answer caches that must be cleared together with this one
+        self.dependents: List[Any] = []
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        text = unicodedata.normalize("NFC", text).casefold()
+        return " ".join(cls.PUNCTUATION.sub(" ", text).split())
+
+    def make_key(self, query_text: str, intent: str, entities: Dict, language: str,
+                 district: Optional[str], rules_version: str) -> str:
+        entity_key = {
+            name: sorted(values) if isinstance(values, list) else values
+            for name, values in sorted(entities.items())
+        }
+        raw = json.dumps(
+            [self.normalize(query_text), intent, entity_key, language, (district or "").casefold(), rules_version],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl(self, intent: str) -> int:
+        return int(settings.ANSWER_CACHE_TTLS.get(intent, settings.ANSWER_CACHE_TTLS["general_query"]))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        await self._refresh_generation()
+
+        entry = self.local.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self.local.move_to_end(key)
+                ANSWER_CACHE_REQUESTS.labels(tier="local", result="hit").inc()
+                return value
+            del self.local[key]
+        ANSWER_CACHE_REQUESTS.labels(tier="local", result="miss").inc()
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self._redis_key(key))
+            pipe.ttl(self._redis_key(key))
+            raw, ttl = await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Answer cache lookup failed: {str(e)}")
+            raw, ttl = None, -1
+
+        if raw is None:
+            ANSWER_CACHE_REQUESTS.labels(tier="redis", result="miss").inc()
+            return None
+
+        ANSWER_CACHE_REQUESTS.labels(tier="redis", result="hit").inc()
+        value = json.loads(raw)
+        if ttl > 0:
+            self._store_local(key, value, ttl)
+        return value
+
+    async def set(self, key: str, intent: str, value: Dict[str, Any], source_ids: List[str] = ()):
+        ttl = self.ttl(intent)
+        self._store_local(key, value, ttl)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.setex(self._redis_key(key), ttl, json.dumps(value, ensure_ascii=False))
+            for source_id in source_ids:
+                pipe.sadd(self._source_key(source_id), key)
+                # Keep the index at least as long as the longest-lived entry in it
+                pipe.expire(self._source_key(source_id), ttl, gt=True)
+                pipe.expire(self._source_key(source_id), ttl, nx=True)
+            await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Answer cache store failed: {str(e)}")
+
+    async def invalidate(self):
+        """Drop every cached answer on all replicas, e.g. after the knowledge base changes"""
+        self.generation = str(await self.client.incr(self.GENERATION_KEY))
+        self.generation_checked = time.monotonic()
+        self.clear_local()
+
+    async def invalidate_sources(self, source_ids: List[str]) -> int:
+        """Drop answers that cited any of the given sources on all replicas; returns how many"""
+        if not source_ids:
+            return 0
+        # A fresh process such as the re-indexer still holds the initial generation; keys must use the live one
+        generation = await self.client.get(self.GENERATION_KEY) or "0"
+        if generation != self.generation:
+            self.generation = generation
+            self.clear_local()
+        source_keys = [self._source_key(source_id) for source_id in source_ids]
+        keys = list(await self.client.sunion(source_keys))
+
+        pipe = self.client.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*[self._redis_key(key) for key in keys])
+        pipe.delete(*source_keys)
+        pipe.xadd(self.INVALIDATION_STREAM,
+                  {"keys": json.dumps(keys), "sources": json.dumps(list(source_ids))},
+                  maxlen=self.INVALIDATION_STREAM_LENGTH, approximate=True)
+        await pipe.execute()
+
+        self._drop_local(keys, source_ids)
+        return len(keys)
+
+    async def _refresh_generation(self):
+        if time.monotonic() - self.generation_checked < self.GENERATION_REFRESH_SECONDS:
+            return
+        self.generation_checked = time.monotonic()
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self.GENERATION_KEY)
+            pipe.xrange(self.INVALIDATION_STREAM, min=f"({self.invalidation_cursor}")
+            generation, invalidations = await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Answer cache generation check failed: {str(e)}")
+            return
+
+        generation = generation or "0"
+        if generation != self.generation:
+            self.generation = generation
+            self.clear_local()
+
+        for entry_id, fields in invalidations:
+            self._drop_local(json.loads(fields["keys"]), json.loads(fields["sources"]))
+            self.invalidation_cursor = entry_id
+
+    def _drop_local(self, keys: List[str], source_ids: List[str]):
+        for key in keys:
+            self.local.pop(key, None)
+        for cache in self.dependents:
+            cache.drop_sources(source_ids)
+
+    def clear_local(self):
+        """Empty this replica's in-process tiers; Redis entries are untouched"""
+        self.local.clear()
+        for cache in self.dependents:
+            cache.clear()
+
+    def _redis_key(self, key: str) -> str:
+        return f"answer:{self.generation}:{key}"
+
+    def _source_key(self, source_id: str) -> str:
+        return f"answer_cache:source:{self.generation}:{source_id}"
+
+    def _store_local(self, key: str, value: Dict[str, Any], ttl: int):
+        self.local[key] = (time.time() + ttl, value)
+        self.local.move_to_end(key)
+        while len(self.local) > settings.ANSWER_CACHE_LOCAL_SIZE:
+            self.local.popitem(last=False)
+
+
+class SemanticCache:
+    """In-process cache of answers keyed by query embedding similarity.
+
+    Catches differently worded versions of the same question that the exact
+    AnswerCache misses. Entries are partitioned by intent, language and
+    district, and a lookup returns the most similar entry at or above
+    SEMANTIC_CACHE_THRESHOLD cosine similarity. Callers must re-validate hits
+    against the current safety rules.
+    """
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # partition -> {"vectors": unit-normalized (n, dim) matrix,
+        #               "entries": [(expires_at, value, llm_seconds, source_ids)]}
+        self.partitions: Dict[tuple, Dict[str, Any]] = {}
+
+    def lookup(self, partition: tuple, embedding: List[float]) -> Optional[tuple]:
+        """Return (value, similarity, llm_seconds) for the closest live entry above the threshold"""
+        bucket = self.partitions.get(partition)
+        if not bucket or not bucket["entries"]:
+            SEMANTIC_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        similarities = bucket["vectors"] @ self._unit(embedding)
+        now = time.time()
+        expired = np.array([entry[0] <= now for entry in bucket["entries"]])
+        similarities[expired] = -1.0
+
+        best = int(np.argmax(similarities))
+        SEMANTIC_CACHE_SIMILARITY.observe(max(float(similarities[best]), 0.0))
+        if similarities[best] < self.threshold:
+            SEMANTIC_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        _, value, llm_seconds, _ = bucket["entries"][best]
+        return value, float(similarities[best]), llm_seconds
+
+    def add(self, partition: tuple, embedding: List[float], value: Dict[str, Any],
+            llm_seconds: float, ttl: int, source_ids: List[str] = ()):
+        bucket = self.partitions.setdefault(partition, {"vectors": None, "entries": []})
+        vector = self._unit(embedding)[None, :]
+
+        # Drop expired entries and, if still full, the oldest ones
+        now = time.time()
+        keep = [i for i, entry in enumerate(bucket["entries"]) if entry[0] > now]
+        keep = keep[-(self.max_entries - 1):] if self.max_entries > 1 else []
+        if bucket["vectors"] is not None and keep:
+            bucket["vectors"] = np.vstack([bucket["vectors"][keep], vector])
+        else:
+            bucket["vectors"] = vector
+        bucket["entries"] = [bucket["entries"][i] for i in keep] + [(now + ttl, value, llm_seconds, set(source_ids))]
+
+    def clear(self):
+        self.partitions.clear()
+
+    def drop_sources(self, source_ids: List[str]):
+        """Remove entries whose answer cited any of the given sources"""
+        source_ids = set(source_ids)
+        for bucket in self.partitions.values():
+            keep = [i for i, entry in enumerate(bucket["entries"]) if not entry[3] & source_ids]
+            if len(keep) == len(bucket["entries"]):
+                continue
+            bucket["vectors"] = bucket["vectors"][keep] if keep else None
+            bucket["entries"] = [bucket["entries"][i] for i in keep]
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+answer_cache = AnswerCache(redis_client)
+semantic_cache = SemanticCache(settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_SIZE)
+answer_cache.dependents.append(semantic_cache)
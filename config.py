@@ -0,0 +1,114 @@
+"""Settings shared by the API, the inference process and the offline jobs.
+
+Read from the environment only, so importing them pulls in no models or clients.
+"""
+
+import json
+import os
+
+class Settings:
+    DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db:5432/krishi_db")
+    REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_LOCAL_SIZE = int(os.getenv("ANSWER_CACHE_LOCAL_SIZE", "1024"))
+    # Seconds to keep an answer per intent: weather goes stale fast, treatments do not
+    ANSWER_CACHE_TTLS = json.loads(os.getenv("ANSWER_CACHE_TTLS", json.dumps({
+        "weather_query": 15 * 60,
+        "market_price_query": 60 * 60,
+        "government_scheme_query": 24 * 60 * 60,
+        "crop_disease_query": 7 * 24 * 60 * 60,
+        "pest_control_query": 7 * 24 * 60 * 60,
+        "fertilizer_query": 7 * 24 * 60 * 60,
+        "planting_advice_query": 3 * 24 * 60 * 60,
+        "harvesting_query": 3 * 24 * 60 * 60,
+        "general_query": 60 * 60
+    })))
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    # Minimum cosine similarity between query embeddings for a cached answer to be reused
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))
+    EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME",
+                                     "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "8192"))
+    # Share query embeddings across replicas through Redis
+    EMBEDDING_CACHE_REDIS = os.getenv("EMBEDDING_CACHE_REDIS", "false").lower() == "true"
+    EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 60 * 60)))
+    # Local snapshot of the Milvus collection, built with `python knowledge_index.py export`
+    LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "./data/knowledge_snapshot")
+    # Older snapshots are only used when Milvus is unavailable
+    LOCAL_INDEX_MAX_AGE = float(os.getenv("LOCAL_INDEX_MAX_AGE", str(24 * 60 * 60)))
+    LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+    # Candidates per result re-scored exactly on quantized snapshots (binary needs more than int8)
+    LOCAL_INDEX_RESCORE_FACTOR = int(os.getenv("LOCAL_INDEX_RESCORE_FACTOR", "4"))
+    LOCAL_INDEX_RELOAD_INTERVAL = float(os.getenv("LOCAL_INDEX_RELOAD_INTERVAL", "30"))
+    # Candidates fetched per requested result for metadata re-ranking
+    RAG_RERANK_FACTOR = int(os.getenv("RAG_RERANK_FACTOR", "3"))
+    # "hybrid" fuses BM25 and vector results; "dense" and "sparse" use one retriever
+    RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+    # A BM25 top hit this strong, and this far ahead of the runner-up, skips the embedding call
+    BM25_CONFIDENT_SCORE = float(os.getenv("BM25_CONFIDENT_SCORE", "0.8"))
+    BM25_CONFIDENT_MARGIN = float(os.getenv("BM25_CONFIDENT_MARGIN", "1.5"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    MILVUS_HOST = os.getenv("MILVUS_HOST", "milvus")
+    MILVUS_PORT = int(os.getenv("MILVUS_PORT", "19530"))
+    AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET", "krishi-storage")
+    # Point at an S3-compatible stand-in such as MinIO for local development and tests
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+    MEDIA_UPLOAD_QUEUE_SIZE = int(os.getenv("MEDIA_UPLOAD_QUEUE_SIZE", "256"))
+    # In-memory media the upload queue may hold, so an S3 outage cannot exhaust the container's memory;
+    # uploads spilled to UPLOAD_DIR only hold a path
+    MEDIA_UPLOAD_QUEUE_BYTES = int(os.getenv("MEDIA_UPLOAD_QUEUE_BYTES", str(128 * 1024 * 1024)))
+    MEDIA_UPLOAD_WORKERS = int(os.getenv("MEDIA_UPLOAD_WORKERS", "2"))
+    MEDIA_UPLOAD_RETRIES = int(os.getenv("MEDIA_UPLOAD_RETRIES", "3"))
+    S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+    JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
+    WHISPER_MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", "./models/whisper-malayalam")
+    YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "./models/yolo-crop-disease.pt")
+    LLM_MODEL_PATH = os.getenv("LLM_MODEL_PATH", "./models/llama2-7b-kerala-agri")
+    # "auto" picks CUDA when available
+    LLM_DEVICE = os.getenv("LLM_DEVICE", "auto")
+    LLM_MAX_NEW_TOKENS = int(os.getenv("LLM_MAX_NEW_TOKENS", "256"))
+    # Reuse the KV cache of the constant advisor preamble instead of re-encoding it per request
+    LLM_PREFIX_CACHE_ENABLED = os.getenv("LLM_PREFIX_CACHE_ENABLED", "true").lower() == "true"
+    # Either a rules file or kerala_agriculture_data.json, whose "safety_rules" section is used
+    SAFETY_RULES_PATH = os.getenv("SAFETY_RULES_PATH", "./kerala_agriculture_data.json")
+    # Seconds between checks of the rules file for changes
+    SAFETY_RULES_RELOAD_INTERVAL = float(os.getenv("SAFETY_RULES_RELOAD_INTERVAL", "10"))
+    NLU_GAZETTEER_PATH = os.getenv("NLU_GAZETTEER_PATH", "./kerala_agriculture_data.json")
+    MALAYALAM_NORMALIZATION_PATH = os.getenv("MALAYALAM_NORMALIZATION_PATH", "./malayalam_normalization.json")
+    INTENT_CLASSIFIER_PATH = os.getenv("INTENT_CLASSIFIER_PATH", "./models/intent_classifier.npz")
+    # Below this classifier probability the keyword rules decide the intent
+    INTENT_MIN_PROBABILITY = float(os.getenv("INTENT_MIN_PROBABILITY", "0.5"))
+    # Intents answered straight from retrieved advisories, without the LLM, when the classifier is this sure.
+    # Off by default: the answer is the top chunks verbatim, so only list intents (e.g.
+    # market_price_query,weather_query) whose knowledge base entries read as complete answers
+    SHORT_CIRCUIT_INTENTS = set(filter(None, os.getenv("SHORT_CIRCUIT_INTENTS", "").split(",")))
+    SHORT_CIRCUIT_MIN_PROBABILITY = float(os.getenv("SHORT_CIRCUIT_MIN_PROBABILITY", "0.8"))
+    MODEL_LOADER_THREADS = int(os.getenv("MODEL_LOADER_THREADS", "4"))
+    # A model that fails to load is retried this many times, waiting MODEL_LOAD_RETRY_DELAY, then twice that, ...
+    MODEL_LOAD_RETRIES = int(os.getenv("MODEL_LOAD_RETRIES", "3"))
+    MODEL_LOAD_RETRY_DELAY = float(os.getenv("MODEL_LOAD_RETRY_DELAY", "5"))
+    # "local" loads models in every worker; "remote" forwards model calls to inference_server.py
+    INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+    INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "/tmp/krishi-inference.sock")
+    INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "120"))
+    INFERENCE_POLL_INTERVAL = float(os.getenv("INFERENCE_POLL_INTERVAL", "5"))
+    # Must be shared with the inference process when INFERENCE_MODE=remote
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp")
+    # Uploads up to this size are decoded in memory; larger ones spill to UPLOAD_DIR
+    MEDIA_SPILL_BYTES = int(os.getenv("MEDIA_SPILL_BYTES", str(8 * 1024 * 1024)))
+    INFERENCE_METRICS_PORT = int(os.getenv("INFERENCE_METRICS_PORT", "9101"))
+    # Worker threads per pipeline stage for blocking model calls
+    ASR_WORKERS = int(os.getenv("ASR_WORKERS", "1"))
+    CV_WORKERS = int(os.getenv("CV_WORKERS", "2"))
+    RAG_WORKERS = int(os.getenv("RAG_WORKERS", "4"))
+    LLM_WORKERS = int(os.getenv("LLM_WORKERS", "1"))
+    NLU_WORKERS = int(os.getenv("NLU_WORKERS", "2"))
+    NLU_MAX_BATCH_SIZE = int(os.getenv("NLU_MAX_BATCH_SIZE", "1000"))
+    # YOLO micro-batching: flush after this many images or this many ms, whichever comes first
+    CV_MAX_BATCH_SIZE = int(os.getenv("CV_MAX_BATCH_SIZE", "8"))
+    CV_MAX_BATCH_WAIT_MS = float(os.getenv("CV_MAX_BATCH_WAIT_MS", "10"))
+
+settings = Settings()
@@ -0,0 +1,178 @@
+"""Dosage extraction from advisory answers in Malayalam and English.
+
+Concentrations (0.1%, 0.2 ശതമാനം), rates (2 g/L, 2 ml per litre,
+5 ml per 10 litres, 2 ഗ്രാം ഒരു ലിറ്റർ വെള്ളത്തിൽ, ഒരു ലിറ്റർ വെള്ളത്തിൽ 2 ഗ്രാം,
+25 kg/acre, ഏക്കറിന് 25 കിലോ) and application counts (2 sprays, twice,
+രണ്ടു തവണ) are recognized by one compiled regular expression, so an answer
+is scanned once whatever the number of forms. Rates are normalized to one
+litre or acre. How often a day or week something is done ("3 times a day",
+ദിവസം 3 തവണ) is a schedule, not an application count, and is skipped.
+
+Chemical names are found by the safety rules' keyword automaton instead of
+this expression: hundreds of names and aliases as regex alternatives would
+be tried one by one at every position. Both scans are linear, and each
+dosage is attributed to the chemical mention nearest to it by a bisect over
+the automaton's offsets.
+"""
+
+import bisect
+import re
+from typing import Dict, List, Any, Optional
+
+NUMBER = r"\d+(?:\.\d+)?"
+# A range such as 0.1-0.2% is checked at its upper end
+QUANTITY = rf"(?P<{{name}}>{NUMBER})(?:\s*(?:-|–|to|മുതൽ)\s*(?P<{{name}}_upper>{NUMBER}))?"
+
+AMOUNT_UNITS = {
+    "ml": r"ml|millilit(?:re|er)s?|മില്ലി\s*ലിറ്റ[ർറ]\S*|മില്ലി|മി\.\s*ലി\.?",
+    "kg": r"kgs?|kilo(?:gram)?s?|കിലോ\s*ഗ്രാം\S*|കിലോ\S*",
+    "g": r"g|gms?|grams?|ഗ്രാം\S*",
+}
+PER_UNITS = {
+    "L": r"l|ltrs?|lit(?:re|er)s?|ലിറ്റ[ർറ]\S*",
+    "acre": r"acres?|ഏക്ക[ർറ]\S*",
+}
+# "per", "in 1", "for one", "/", "പ്രതി", "ഓരോ", "ഒരു" between an amount and what it is per
+PER = r"(?:(?:/|(?:per|in|for|of|an?|each|every|one|1)(?![a-z])|പ്രതി|ഓരോ|ഒരു)\s*){0,3}"
+WATER = r"(?:\s*(?:of\s+)?water|\s*വെള്ളത്തി\S*)?"
+# How many litres or acres the amount is for, as in "5 ml per 10 litres"; the lookbehind keeps
+# PER from taking the "1" of "10" as "one"
+PER_COUNT = rf"(?:(?<![\d.])(?P<{{name}}>{NUMBER})\s*)?"
+# "3 times a day", "twice daily", "ദിവസം 3 തവണ", "വാരത്തിൽ മൂന്നു തവണ": a schedule, not a count of applications
+FREQUENCY_AFTER = r"(?!\s*(?:(?:a|per|each|every|in\s+a)\s+(?:day|week)|daily|weekly)(?![a-z]))"
+FREQUENCY_WORDS = (
+    r"ദിവസം|ദിവസേന|ദിവസത്തിൽ|ദിവസവും|ദിനംപ്രതി|ദിനവും|പ്രതിദിനം|"
+    r"ആഴ്ചയിൽ|ആഴ്ചതോറും|ആഴ്ചയും|വാരത്തിൽ|വാരംതോറും|പ്രതിവാരം|daily|weekly"
+)
+
+NUMBER_WORDS = {
+    "once": 1, "one": 1, "twice": 2, "two": 2, "thrice": 3, "three": 3, "four": 4, "five": 5, "six": 6,
+    "ഒരു": 1, "ഒന്ന്": 1, "രണ്ടു": 2, "രണ്ട്": 2, "മൂന്നു": 3, "മൂന്ന്": 3,
+    "നാലു": 4, "നാല്": 4, "അഞ്ചു": 5, "അഞ്ച്": 5, "ആറു": 6, "ആറ്": 6,
+}
+COUNT = "|".join([r"\d+"] + sorted((word for word in NUMBER_WORDS if word not in ("once", "twice", "thrice")),
+                                    key=len, reverse=True))
+TIMES = r"times|applications?|sprays?|sprayings|rounds?|doses?|തവണ|പ്രാവശ്യം|സ്പ്രേ\S*"
+
+
+def _alternation(units: Dict[str, str], prefix: str) -> str:
+    return "(?:" + "|".join(f"(?P<{prefix}_{name}>{pattern})" for name, pattern in units.items()) + ")"
+
+
+def _compile() -> "re.Pattern":
+    def quantity(name: str) -> str:
+        return QUANTITY.format(name=name)
+
+    amount, per = _alternation(AMOUNT_UNITS, "amount"), _alternation(PER_UNITS, "per")
+    reverse_amount, reverse_per = _alternation(AMOUNT_UNITS, "ramount"), _alternation(PER_UNITS, "rper")
+    # Every form starts with a digit, a number word or a litre/acre word; checking that one
+    # character first lets the scan skip most positions without trying each alternative
+    first = r"\d" + "".join(sorted({word[0] for word in NUMBER_WORDS} | {"l", "a", "ല", "ഏ"}
+                                    | {word[0] for word in FREQUENCY_WORDS.split("|")}))
+    return re.compile(
+        f"(?=[{first}])(?:" + "|".join([
+            # 2 g per litre of water, 25 kg/acre
+            rf"{quantity('rate')}\s*{amount}(?![a-z])\s*{PER}{PER_COUNT.format(name='per_count')}"
+            rf"{per}(?![a-z]){WATER}",
+            # (ഒരു) ലിറ്റർ വെള്ളത്തിൽ 2 ഗ്രാം, 10 ലിറ്റർ വെള്ളത്തിൽ 5 മില്ലി, (per) acre 25 kg
+            rf"{PER_COUNT.format(name='rper_count')}{reverse_per}(?![a-z]){WATER}\s*"
+            rf"{quantity('reverse')}\s*{reverse_amount}(?![a-z])",
+            # 0.1%, 0.1 ശതമാനം
+            rf"{quantity('percent')}\s*(?:%|percent|ശതമാന\S*)",
+            # ദിവസം 3 തവണ: matched whole so that the count inside is not taken for an application count
+            rf"(?<![a-z])(?P<frequency>{FREQUENCY_WORDS})\s*(?:(?:{COUNT})\s*(?:{TIMES})|twice|thrice)(?![a-z])",
+            # 2 sprays, രണ്ടു തവണ, twice
+            rf"(?P<count>{COUNT})\s*(?:{TIMES})(?![a-z]){FREQUENCY_AFTER}",
+            rf"(?<![a-z])(?P<multiple>twice|thrice)(?![a-z]){FREQUENCY_AFTER}",
+        ]) + ")",
+        re.IGNORECASE
+    )
+
+
+DOSAGE_PATTERN = _compile()
+SENTENCE_END = re.compile(r"[!?।\n]|\.(?!\d)")
+
+
+def _number(match: "re.Match", name: str) -> float:
+    upper = match.group(f"{name}_upper")
+    return float(upper if upper is not None else match.group(name))
+
+
+def _per_count(match: "re.Match", name: str) -> float:
+    count = match.group(name)
+    return float(count) if count is not None and float(count) > 0 else 1.0
+
+
+def _unit(match: "re.Match", prefix: str, units: Dict[str, str]) -> str:
+    return next(name for name in units if match.group(f"{prefix}_{name}") is not None)
+
+
+def extract_dosages(text: str) -> List[Dict[str, Any]]:
+    """Every dosage in the text as {"kind", "value", "unit", "start", "end", "text"}.
+
+    kind is "concentration" (unit "%"), "rate" (unit such as "g/L" or
+    "kg/acre") or "applications" (unit "times").
+    """
+    dosages = []
+    for match in DOSAGE_PATTERN.finditer(text):
+        if match.group("rate") is not None:
+            kind, value = "rate", _number(match, "rate") / _per_count(match, "per_count")
+            unit = f"{_unit(match, 'amount', AMOUNT_UNITS)}/{_unit(match, 'per', PER_UNITS)}"
+        elif match.group("reverse") is not None:
+            kind, value = "rate", _number(match, "reverse") / _per_count(match, "rper_count")
+            unit = f"{_unit(match, 'ramount', AMOUNT_UNITS)}/{_unit(match, 'rper', PER_UNITS)}"
+        elif match.group("percent") is not None:
+            kind, value, unit = "concentration", _number(match, "percent"), "%"
+        elif match.group("frequency") is not None:
+            continue
+        else:
+            count = match.group("count") or match.group("multiple")
+            kind, unit = "applications", "times"
+            value = float(count) if count.isdigit() else float(NUMBER_WORDS[count.lower()])
+        dosages.append({
+            "kind": kind, "value": value, "unit": unit,
+            "start": match.start(), "end": match.end(), "text": match.group()
+        })
+    return dosages
+
+
+def concentration_percent(dosage: Dict[str, Any]) -> Optional[float]:
+    """The dosage as a spray concentration in percent; 1 g or 1 ml per litre is 0.1%"""
+    if dosage["unit"] == "%":
+        return dosage["value"]
+    if dosage["unit"] in ("g/L", "ml/L"):
+        return dosage["value"] / 10
+    if dosage["unit"] == "kg/L":
+        return dosage["value"] * 100
+    return None
+
+
+def parse_percent(limit: Any) -> float:
+    """0.1 from "0.1%" or 0.1"""
+    return float(str(limit).strip().rstrip("%"))
+
+
+def attribute(text: str, dosages: List[Dict[str, Any]], mentions: List[Dict[str, Any]]):
+    """Set dosage["chemical"] to the chemical mention it most likely refers to.
+
+    The nearest mention in the same sentence wins; a dosage in a sentence
+    without one ("Repeat twice.") belongs to the last chemical mentioned
+    before it. Dosages with no chemical before or beside them get None.
+    """
+    mentions = sorted(mentions, key=lambda mention: mention["start"])
+    ends = [match.end() for match in SENTENCE_END.finditer(text)]
+    starts = [mention["start"] for mention in mentions]
+    sentences = [bisect.bisect_right(ends, mention["start"]) for mention in mentions]
+
+    for dosage in dosages:
+        sentence = bisect.bisect_right(ends, dosage["start"])
+        nearby = [
+            mention for mention, mention_sentence in zip(mentions, sentences) if mention_sentence == sentence
+        ]
+        if nearby:
+            nearest = min(nearby, key=lambda mention: max(mention["start"] - dosage["end"],
+                                                          dosage["start"] - mention["end"]))
+            dosage["chemical"] = nearest["chemical"]
+        else:
+            before = bisect.bisect_left(starts, dosage["start"])
+            dosage["chemical"] = mentions[before - 1]["chemical"] if before else None
@@ -1,66 +1,102 @@
 
 import asyncio
+import base64
+import copy
+import functools
+import hashlib
+import io
 import json
 import logging
 import os
+import subprocess
+import threading
+import time
+import unicodedata
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Union
 from pathlib import Path
 
 import numpy as np
 import cv2
 from PIL import Image
 import torch
-from transformers import AutoTokenizer, AutoModel
+from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers.generation.streamers import BaseStreamer
 import whisper
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Milvus
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from pydantic import BaseModel, Field
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import asyncpg
-import redis
 import boto3
-from prometheus_client import Counter, Histogram, generate_latest
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 import sentry_sdk
 
-# Configuration
-class Settings:
-    DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db:5432/krishi_db")
-    REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
-    MILVUS_HOST = os.getenv("MILVUS_HOST", "milvus")
-    MILVUS_PORT = int(os.getenv("MILVUS_PORT", "19530"))
-    AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET", "krishi-storage")
-    JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
-    WHISPER_MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", "./models/whisper-malayalam")
-    YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "./models/yolo-crop-disease.pt")
-    LLM_MODEL_PATH = os.getenv("LLM_MODEL_PATH", "./models/llama2-7b-kerala-agri")
-    SAFETY_RULES_PATH = os.getenv("SAFETY_RULES_PATH", "./data/safety_rules.json")
-
-settings = Settings()
+from caches import SEMANTIC_CACHE_REQUESTS, answer_cache, redis_client, redis_pool, semantic_cache
+from config import settings
+from dosage_extractor import attribute, concentration_percent, extract_dosages, parse_percent
+from keyword_automaton import KeywordAutomaton
+from malayalam_normalizer import MalayalamNormalizer
+from nlu import NLUProcessor
+from knowledge_index import (
+    LocalVectorIndex, bm25_is_confident, metadata_tokens, milvus_filter_expr, reciprocal_rank_fusion
+)
 
 # Database setup
 engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
-# Redis setup
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-
 # S3 setup
-s3_client = boto3.client("s3")
+s3_client = boto3.client("s3", endpoint_url=settings.S3_ENDPOINT_URL)
 
 # Monitoring setup
 REQUEST_COUNT = Counter("api_requests_total", "Total API requests", ["method", "endpoint"])
 REQUEST_LATENCY = Histogram("api_request_duration_seconds", "Request latency")
+BATCH_SIZE = Histogram("inference_batch_size", "Requests per batched model call", ["stage"],
+                       buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_WAIT = Histogram("inference_batch_wait_seconds", "Time a request waited for its batch to start", ["stage"],
+                       buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+MODEL_READY = Gauge("ml_model_ready", "Whether an ML model is loaded and ready (1) or not (0)", ["model"])
+MODEL_LOAD_SECONDS = Gauge("ml_model_load_seconds", "Time taken to load an ML model", ["model"])
+STAGE_QUEUE_DEPTH = Gauge("inference_stage_queue_depth", "Calls waiting for a free stage worker", ["stage"])
+REDIS_POOL_CONNECTIONS = Gauge("redis_pool_connections", "Redis pool connections by state", ["state"])
+REDIS_POOL_CONNECTIONS.labels(state="in_use").set_function(lambda: len(redis_pool._in_use_connections))
+REDIS_POOL_CONNECTIONS.labels(state="idle").set_function(lambda: len(redis_pool._available_connections))
+REDIS_POOL_CONNECTIONS.labels(state="max").set(settings.REDIS_MAX_CONNECTIONS)
+LLM_SECONDS_SAVED = Counter("semantic_cache_llm_seconds_saved_total",
+                            "LLM generation time skipped by semantic cache hits")
+LLM_SHORT_CIRCUITS = Counter("llm_short_circuits_total",
+                             "Queries answered from retrieved context without the LLM", ["intent"])
+EMBEDDING_CACHE_REQUESTS = Counter("embedding_cache_requests_total", "Query embedding cache lookups",
+                                   ["tier", "result"])
+EMBEDDING_SECONDS_SAVED = Counter("embedding_cache_seconds_saved_total",
+                                  "Embedding model time skipped by query embedding cache hits")
+RETRIEVAL_REQUESTS = Counter("rag_retrievals_total", "Knowledge base searches by backend", ["backend"])
+EMBEDDINGS_SKIPPED = Counter("rag_embeddings_skipped_total", "Retrievals answered by a confident BM25 hit alone")
+LOCAL_INDEX_AGE = Gauge("rag_local_index_age_seconds", "Age of the loaded local knowledge snapshot")
+MEDIA_UPLOADS = Counter("media_uploads_total", "Farmer media archive attempts by outcome", ["result"])
+STAGE_IN_FLIGHT = Gauge("inference_stage_in_flight", "Calls currently running on stage workers", ["stage"])
+LLM_TIME_TO_FIRST_TOKEN = Histogram("llm_time_to_first_token_seconds",
+                                    "Time from generation start to the first answer token", ["prefix_cache"],
+                                    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0))
+SAFETY_RULES_VERSION = Gauge("safety_rules_version_info", "Safety rules version in use (1 for the current one)",
+                             ["version"])
+SAFETY_RULES_RELOADS = Counter("safety_rules_reloads_total", "Safety rules reload attempts by outcome", ["result"])
 
 # Initialize FastAPI
 app = FastAPI(
@@ -95,6 +131,11 @@ class QueryRequest(BaseModel):
     query_text: Optional[str] = None
     query_type: str = Field(..., regex="^(voice|text|image)$")
     location_coordinates: Optional[Dict[str, float]] = None
+    location_district: Optional[str] = None
+    language: str = "ml"
+
+class NLUBatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_items=settings.NLU_MAX_BATCH_SIZE)
 
 class QueryResponse(BaseModel):
     query_id: int
@@ -104,39 +145,254 @@ class QueryResponse(BaseModel):
     source_citations: List[str] = []
     is_escalated: bool = False
     escalation_reason: Optional[str] = None
+    # Chemical mentions and dosages found by the safety scan, with character offsets into response_text
+    safety_matches: List[Dict[str, Any]] = []
+    # Version of the safety rules the answer was checked against
+    safety_rules_version: Optional[str] = None
 
 class EscalationRequest(BaseModel):
     query_id: int
     reason: str
     priority: str = "medium"
 
+# Inference worker pools
+class StagePool:
+    """Runs one pipeline stage's blocking model calls off the event loop.
+
+    Model calls (Whisper, YOLO, Milvus search, LLM) hold C extensions that
+    release the GIL, so a small thread pool per stage keeps the event loop free
+    for health checks and logins. Calls beyond the pool size queue on a
+    semaphore so the queue depth can be exported as a metric.
+    """
+
+    def __init__(self, stage: str, max_workers: int):
+        self.stage = stage
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{stage}-worker")
+        self.slots = asyncio.Semaphore(max_workers)
+
+    async def run(self, func, *args, **kwargs):
+        STAGE_QUEUE_DEPTH.labels(stage=self.stage).inc()
+        try:
+            await self.slots.acquire()
+        finally:
+            STAGE_QUEUE_DEPTH.labels(stage=self.stage).dec()
+
+        STAGE_IN_FLIGHT.labels(stage=self.stage).inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            STAGE_IN_FLIGHT.labels(stage=self.stage).dec()
+            self.slots.release()
+
+class MicroBatcher:
+    """Collects concurrent requests for a stage into one batched model call.
+
+    A batch is flushed once it holds max_batch_size items or the oldest item
+    has waited max_wait seconds. batch_fn runs on the stage pool, takes the list
+    of items and returns one result per item; an Exception in place of a result
+    fails only that item's request.
+    """
+
+    def __init__(self, stage: str, batch_fn, pool: StagePool, max_batch_size: int, max_wait: float):
+        self.stage = stage
+        self.batch_fn = batch_fn
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._collector: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks; in-flight batches are held here
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = batch[0][2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Run batches concurrently up to the pool size; the pool queues the rest
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[tuple]):
+        started = time.perf_counter()
+        BATCH_SIZE.labels(stage=self.stage).observe(len(batch))
+        for _, _, enqueued in batch:
+            BATCH_WAIT.labels(stage=self.stage).observe(started - enqueued)
+
+        futures = [future for _, future, _ in batch]
+        try:
+            results = await self.pool.run(self.batch_fn, [item for item, _, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+stage_pools = {
+    "asr": StagePool("asr", settings.ASR_WORKERS),
+    "cv": StagePool("cv", settings.CV_WORKERS),
+    "rag": StagePool("rag", settings.RAG_WORKERS),
+    "llm": StagePool("llm", settings.LLM_WORKERS),
+    "nlu": StagePool("nlu", settings.NLU_WORKERS),
+}
+
+def llm_device() -> str:
+    """LLM_DEVICE, with "auto" resolved to CUDA when it is available"""
+    if settings.LLM_DEVICE != "auto":
+        return settings.LLM_DEVICE
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
 # ML Models Manager
 class MLModels:
+    # Model name -> models that must finish loading before it can start
+    LOAD_DEPENDENCIES = {
+        "whisper": (),
+        "yolo": (),
+        "embeddings": (),
+        "vector_store": ("embeddings",),
+        "local_index": (),
+        "safety_rules": (),
+        "llm": (),
+    }
+    # Models text queries cannot be answered without; voice and image models can fail on their own
+    TEXT_MODELS = ("embeddings", "safety_rules", "llm")
+    # Retrieval backends: either one is enough, so only both failing is fatal
+    RETRIEVAL_MODELS = ("vector_store", "local_index")
+
     def __init__(self):
         self.whisper_model = None
         self.yolo_model = None
         self.embeddings_model = None
         self.vector_store = None
+        self.local_index = None
         self.safety_rules = None
         self.llm_tokenizer = None
         self.llm_model = None
-
-    async def initialize(self):
-        """Initialize all ML models"""
+        self.status: Dict[str, str] = {name: "pending" for name in self.LOAD_DEPENDENCIES}
+        self.errors: Dict[str, str] = {}
+        self._ready_events: Dict[str, asyncio.Event] = {}
+        self._load_task: Optional[asyncio.Task] = None
+
+    def start_loading(self, names: Optional[tuple] = None) -> asyncio.Task:
+        """Start loading models in the background and return immediately"""
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self.initialize(names))
+        return self._load_task
+
+    async def initialize(self, names: Optional[tuple] = None):
+        """Initialize ML models concurrently, marking each ready as soon as it loads.
+
+        names limits loading to a subset of models (and their dependencies); the
+        rest are marked skipped, e.g. when another process serves them.
+        """
         logging.info("Initializing ML models...")
 
+        selected = set(names or self.LOAD_DEPENDENCIES)
+        for name in list(selected):
+            selected.update(self.LOAD_DEPENDENCIES[name])
+        for name in self.LOAD_DEPENDENCIES:
+            if name not in selected:
+                self.status[name] = "skipped"
+                self._event(name).set()
+
+        executor = ThreadPoolExecutor(max_workers=settings.MODEL_LOADER_THREADS,
+                                      thread_name_prefix="model-loader")
+        try:
+            await asyncio.gather(*(self._load(name, executor) for name in selected))
+        finally:
+            executor.shutdown(wait=False)
+
+        failed = [name for name, status in self.status.items() if status == "failed"]
+        if failed:
+            logging.error(f"ML models failed to load: {', '.join(failed)}")
+        else:
+            logging.info("All ML models initialized successfully")
+
+    async def _load(self, name: str, executor: ThreadPoolExecutor):
+        """Load one model in a worker thread once its dependencies are ready.
+
+        Transient failures (a model server or Milvus still starting) are retried
+        with exponential backoff; dependents keep waiting until the last attempt.
+        """
+        try:
+            for dependency in self.LOAD_DEPENDENCIES[name]:
+                await self._event(dependency).wait()
+                if self.status[dependency] != "ready":
+                    raise RuntimeError(f"Dependency {dependency} failed to load")
+
+            for attempt in range(settings.MODEL_LOAD_RETRIES + 1):
+                try:
+                    self.status[name] = "loading"
+                    start = time.perf_counter()
+                    loaded = await asyncio.get_running_loop().run_in_executor(executor, getattr(self, f"_load_{name}"))
+                    break
+                except Exception as e:
+                    if attempt == settings.MODEL_LOAD_RETRIES:
+                        raise
+                    delay = settings.MODEL_LOAD_RETRY_DELAY * 2 ** attempt
+                    logging.warning(f"Failed to load model {name}, retrying in {delay:.0f}s: {str(e)}")
+                    self.status[name] = "retrying"
+                    self.errors[name] = str(e)
+                    await asyncio.sleep(delay)
+
+            self.errors.pop(name, None)
+            if loaded is False:
+                # Optional model with nothing to load, e.g. no snapshot exported yet
+                self.status[name] = "absent"
+                logging.info(f"Model {name} absent")
+                return
+            MODEL_LOAD_SECONDS.labels(model=name).set(time.perf_counter() - start)
+
+            self.status[name] = "ready"
+            MODEL_READY.labels(model=name).set(1)
+            logging.info(f"Model {name} ready")
+        except Exception as e:
+            logging.error(f"Failed to load model {name}: {str(e)}")
+            self.status[name] = "failed"
+            self.errors[name] = str(e)
+            MODEL_READY.labels(model=name).set(0)
+        finally:
+            self._event(name).set()
+
+    def _load_whisper(self):
         # Load Whisper for Malayalam ASR
         self.whisper_model = whisper.load_model(settings.WHISPER_MODEL_PATH)
 
+    def _load_yolo(self):
         # Load YOLOv8 for crop disease detection
         self.yolo_model = torch.hub.load("ultralytics/yolov8", "custom", 
                                        path=settings.YOLO_MODEL_PATH, trust_repo=True)
 
+    def _load_embeddings(self):
         # Load embeddings model for RAG
-        self.embeddings_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        )
+        self.embeddings_model = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
 
+    def _load_vector_store(self):
         # Initialize Milvus vector store
         self.vector_store = Milvus(
             embedding_function=self.embeddings_model,
@@ -144,15 +400,53 @@ class MLModels:
             collection_name="kerala_agri_knowledge"
         )
 
+    def _load_local_index(self):
+        # Load the local knowledge snapshot, if one has been exported
+        if not os.path.exists(os.path.join(settings.LOCAL_INDEX_PATH, "manifest.json")):
+            return False
+        self.local_index = LocalVectorIndex(settings.LOCAL_INDEX_PATH)
+
+    def _load_safety_rules(self):
         # Load safety rules
-        with open(settings.SAFETY_RULES_PATH, "r", encoding="utf-8") as f:
-            self.safety_rules = json.load(f)
+        self.safety_rules = load_safety_rules(settings.SAFETY_RULES_PATH)
 
+    def _load_llm(self):
         # Load LLM for answer generation
         self.llm_tokenizer = AutoTokenizer.from_pretrained(settings.LLM_MODEL_PATH)
-        self.llm_model = AutoModel.from_pretrained(settings.LLM_MODEL_PATH)
-
-        logging.info("All ML models initialized successfully")
+        self.llm_model = AutoModelForCausalLM.from_pretrained(settings.LLM_MODEL_PATH).to(llm_device()).eval()
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._ready_events:
+            self._ready_events[name] = asyncio.Event()
+        return self._ready_events[name]
+
+    async def wait_loaded(self, *names: str) -> bool:
+        """Wait until the given models have finished loading; True if all loaded successfully"""
+        for name in names:
+            await self._event(name).wait()
+        return self.is_ready(*names)
+
+    def is_ready(self, *names: str) -> bool:
+        return all(self.status[name] == "ready" for name in names)
+
+    def any_ready(self, *names: str) -> bool:
+        return any(self.status[name] == "ready" for name in names)
+
+    def failed_required(self) -> List[str]:
+        """Models text queries need that gave up loading; the worker cannot recover without a restart"""
+        failed = [name for name in self.TEXT_MODELS if self.status[name] == "failed"]
+        retrieval = [self.status[name] for name in self.RETRIEVAL_MODELS]
+        if "failed" in retrieval and all(status in ("failed", "absent") for status in retrieval):
+            failed += [name for name in self.RETRIEVAL_MODELS if self.status[name] == "failed"]
+        return failed
+
+    def readiness(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """Per-model load status for the readiness endpoint"""
+        return {
+            name: {"status": status, "error": self.errors.get(name)}
+            for name, status in self.status.items()
+            if status != "skipped"
+        }
 
 ml_models = MLModels()
 
@@ -164,6 +458,211 @@ async def get_db():
         finally:
             await session.close()
 
+# Uploaded media: raw bytes, or a path in UPLOAD_DIR for uploads above MEDIA_SPILL_BYTES
+Media = Union[bytes, str]
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def read_upload(upload: UploadFile, suffix: str) -> Media:
+    """Read an upload into memory, spilling it to UPLOAD_DIR once it exceeds MEDIA_SPILL_BYTES"""
+    buffer = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+        buffer.extend(chunk)
+        if len(buffer) > settings.MEDIA_SPILL_BYTES:
+            path = f"{settings.UPLOAD_DIR}/{uuid.uuid4()}{suffix}"
+            with open(path, "wb") as f:
+                f.write(buffer)
+                while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+            return path
+    return bytes(buffer)
+
+def remove_spilled(media: Optional[Media]):
+    """Delete the file behind spilled media; in-memory media needs no cleanup"""
+    if isinstance(media, str):
+        try:
+            os.remove(media)
+        except FileNotFoundError:
+            pass
+
+def decode_image(media: Media) -> Optional[np.ndarray]:
+    """Decode an image from bytes or a spilled file into a BGR array"""
+    if isinstance(media, str):
+        return cv2.imread(media)
+    return cv2.imdecode(np.frombuffer(media, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def decode_audio(media: Media, sample_rate: int = 16000) -> np.ndarray:
+    """Decode audio to mono float32 PCM, piping bytes through ffmpeg like whisper.load_audio does for files"""
+    source = media if isinstance(media, str) else "pipe:0"
+    cmd = [
+        "ffmpeg", "-threads", "0", "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "pipe:1"
+    ]
+    try:
+        out = subprocess.run(cmd, input=None if isinstance(media, str) else media,
+                             capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+class MediaArchiver:
+    """Archives farmer media to S3 in the background, off the request path.
+
+    Objects are keyed by the SHA-256 of their bytes, so the same photo sent
+    twice is stored once. Uploads go through a queue bounded both in items
+    and in in-memory bytes, drained by MEDIA_UPLOAD_WORKERS workers; large
+    files use multipart upload. A spilled file is queued as a hard link the
+    archiver owns, so the request deletes its own copy whatever happens to
+    the upload; the archiver deletes the link when done, or when it drops it.
+    """
+
+    # Remember this many recently archived keys to skip S3 existence checks
+    RECENT_KEYS = 10000
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.MEDIA_UPLOAD_QUEUE_SIZE)
+        self.pool = StagePool("media_upload", settings.MEDIA_UPLOAD_WORKERS)
+        self.transfer_config = TransferConfig(multipart_threshold=settings.S3_MULTIPART_THRESHOLD)
+        self.recent_keys: OrderedDict = OrderedDict()
+        self.workers: List[asyncio.Task] = []
+        self.bucket_ready = asyncio.Event()
+        # Bytes of in-memory media queued or being uploaded
+        self.queued_bytes = 0
+
+    async def start(self):
+        self.workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.MEDIA_UPLOAD_WORKERS)
+        ]
+        if settings.S3_ENDPOINT_URL:
+            # Local S3 stand-ins start empty, and may come up after the API; uploads queue until then
+            self.workers.append(asyncio.create_task(self._prepare_bucket()))
+        else:
+            self.bucket_ready.set()
+
+    async def _prepare_bucket(self, max_delay: float = 60.0):
+        delay = 1.0
+        while True:
+            try:
+                await self.pool.run(self._ensure_bucket)
+                break
+            except Exception as e:
+                logging.warning(f"Media bucket not available, retrying in {delay:.0f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+        self.bucket_ready.set()
+
+    async def stop(self, timeout: float = 30.0):
+        """Give queued uploads a chance to finish before shutdown"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dropping {self.queue.qsize()} queued media uploads on shutdown")
+        for worker in self.workers:
+            worker.cancel()
+        # Cancelled workers clean up what they were uploading; spilled files still queued are ours too
+        while not self.queue.empty():
+            media, _, _ = self.queue.get_nowait()
+            remove_spilled(media)
+            self.queue.task_done()
+
+    def submit(self, media: Media, prefix: str, suffix: str):
+        """Queue media for archiving without waiting; drops it if the queue is full"""
+        size = 0 if isinstance(media, str) else len(media)
+        if self.queue.full() or self.queued_bytes + size > settings.MEDIA_UPLOAD_QUEUE_BYTES:
+            MEDIA_UPLOADS.labels(result="dropped").inc()
+            logging.warning(f"Media upload queue full, not archiving {prefix} upload")
+            return
+        if isinstance(media, str):
+            try:
+                link = f"{media}.archive"
+                os.link(media, link)
+                media = link
+            except OSError as e:
+                MEDIA_UPLOADS.labels(result="dropped").inc()
+                logging.warning(f"Could not queue spilled {prefix} upload for archiving: {str(e)}")
+                return
+        self.queue.put_nowait((media, prefix, suffix))
+        self.queued_bytes += size
+
+    async def _worker(self):
+        await self.bucket_ready.wait()
+        while True:
+            media, prefix, suffix = await self.queue.get()
+            try:
+                await self._archive(media, prefix, suffix)
+            finally:
+                if not isinstance(media, str):
+                    self.queued_bytes -= len(media)
+                remove_spilled(media)
+                self.queue.task_done()
+
+    async def _archive(self, media: Media, prefix: str, suffix: str):
+        for attempt in range(1, settings.MEDIA_UPLOAD_RETRIES + 1):
+            try:
+                result = await self.pool.run(self._upload, media, prefix, suffix)
+                MEDIA_UPLOADS.labels(result=result).inc()
+                return
+            except Exception as e:
+                logging.warning(f"Media upload attempt {attempt} failed: {str(e)}")
+                if attempt < settings.MEDIA_UPLOAD_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+
+        MEDIA_UPLOADS.labels(result="failed").inc()
+        logging.error(f"Giving up archiving {prefix} upload after {settings.MEDIA_UPLOAD_RETRIES} attempts")
+
+    def _upload(self, media: Media, prefix: str, suffix: str) -> str:
+        """Blocking hash, existence check and upload; returns the outcome label"""
+        s3_key = f"{prefix}/{self._digest(media)}{suffix}"
+        if s3_key in self.recent_keys or self._exists(s3_key):
+            self._remember(s3_key)
+            return "duplicate"
+
+        if isinstance(media, str):
+            s3_client.upload_file(media, settings.AWS_S3_BUCKET, s3_key, Config=self.transfer_config)
+        else:
+            s3_client.upload_fileobj(io.BytesIO(media), settings.AWS_S3_BUCKET, s3_key,
+                                     Config=self.transfer_config)
+        self._remember(s3_key)
+        return "uploaded"
+
+    def _digest(self, media: Media) -> str:
+        if not isinstance(media, str):
+            return hashlib.sha256(media).hexdigest()
+
+        digest = hashlib.sha256()
+        with open(media, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_BYTES):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _exists(self, s3_key: str) -> bool:
+        try:
+            s3_client.head_object(Bucket=settings.AWS_S3_BUCKET, Key=s3_key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def _remember(self, s3_key: str):
+        # Called from worker threads; OrderedDict ops are atomic enough under the GIL for a hint cache
+        self.recent_keys[s3_key] = True
+        self.recent_keys.move_to_end(s3_key)
+        while len(self.recent_keys) > self.RECENT_KEYS:
+            self.recent_keys.popitem(last=False)
+
+    def _ensure_bucket(self):
+        try:
+            s3_client.head_bucket(Bucket=settings.AWS_S3_BUCKET)
+        except ClientError as e:
+            # A 403 means the bucket exists but is not ours to inspect; creating it would fail or mask that
+            if e.response["Error"]["Code"] not in ("404", "NoSuchBucket", "NotFound"):
+                raise
+            s3_client.create_bucket(Bucket=settings.AWS_S3_BUCKET)
+
+media_archiver = MediaArchiver()
+
 # Authentication
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     # Implement JWT token validation
@@ -171,13 +670,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 
 # ML Pipeline Classes
 class ASRProcessor:
-    def __init__(self, model):
+    def __init__(self, model, pool: StagePool):
         self.model = model
+        self.pool = pool
+        # Compiled once: every spelling variant is applied in a single scan of the transcript
+        self.normalizer = MalayalamNormalizer.from_file(settings.MALAYALAM_NORMALIZATION_PATH)
 
-    async def process_voice(self, audio_file_path: str) -> Dict[str, Any]:
+    async def process_voice(self, audio: Media) -> Dict[str, Any]:
         """Process Malayalam voice input"""
         try:
-            result = self.model.transcribe(audio_file_path, language="ml")
+            result = await self.pool.run(self._transcribe, audio)
 
             # Normalize Malayalam text
             normalized_text = self._normalize_malayalam_text(result["text"])
@@ -191,124 +693,28 @@ class ASRProcessor:
             logging.error(f"ASR processing error: {str(e)}")
             return {"text": "", "language": "ml", "confidence": 0.0}
 
+    def _transcribe(self, audio: Media) -> Dict[str, Any]:
+        return self.model.transcribe(decode_audio(audio), language="ml")
+
     def _normalize_malayalam_text(self, text: str) -> str:
         """Normalize Malayalam text and convert common farming terms"""
-        # Add Malayalam text normalization logic
-        normalizations = {
-            "നെല്ല്": "നെൽ",
-            "തെങ്ങിന്": "തെങ്ങ്",
-            "കുരുമുളകിന്": "കുരുമുളക്"
-        }
-
-        for old, new in normalizations.items():
-            text = text.replace(old, new)
-
-        return text.strip()
-
-class NLUProcessor:
-    def __init__(self):
-        self.intents = [
-            "crop_disease_query", "pest_control_query", "fertilizer_query",
-            "weather_query", "market_price_query", "government_scheme_query",
-            "planting_advice_query", "harvesting_query"
-        ]
-
-    async def extract_intent_entities(self, text: str) -> Dict[str, Any]:
-        """Extract intent and entities from farmer query"""
-        # Implement intent classification and entity extraction
-        # This is a simplified version - in production, use a trained model
-
-        entities = {
-            "crops": [],
-            "diseases": [],
-            "pests": [],
-            "location": None,
-            "season": None
-        }
-
-        # Detect crops
-        crop_keywords = {
-            "നെൽ": "rice", "തെങ്ങ്": "coconut", "റബ്ബർ": "rubber",
-            "കുരുമുളക്": "black_pepper", "വാഴ": "banana"
-        }
-
-        for malayalam, english in crop_keywords.items():
-            if malayalam in text:
-                entities["crops"].append(english)
-
-        # Detect diseases
-        disease_keywords = {
-            "ബ്ലാസ്റ്റ്": "blast", "വാട്ടം": "wilt", "പുഴു": "pest",
-            "രോഗം": "disease", "കുത്തിയേറ്റം": "borer"
-        }
-
-        for malayalam, english in disease_keywords.items():
-            if malayalam in text:
-                entities["diseases"].append(english)
-
-        # Determine intent
-        intent = "general_query"
-        if any(word in text for word in ["രോഗം", "ബ്ലാസ്റ്റ്", "വാട്ടം"]):
-            intent = "crop_disease_query"
-        elif any(word in text for word in ["പുഴു", "കീട"]):
-            intent = "pest_control_query"
-        elif any(word in text for word in ["വളം", "ഉര്വരം"]):
-            intent = "fertilizer_query"
-
-        return {
-            "intent": intent,
-            "entities": entities,
-            "confidence": 0.85
-        }
+        return self.normalizer.normalize(text)
 
 class CVProcessor:
-    def __init__(self, model):
+    def __init__(self, model, pool: StagePool):
         self.model = model
+        self.batcher = MicroBatcher("cv", self._detect_batch, pool,
+                                    settings.CV_MAX_BATCH_SIZE, settings.CV_MAX_BATCH_WAIT_MS / 1000)
         self.disease_classes = [
             "healthy", "rice_blast", "coconut_bud_rot", "pepper_quick_wilt",
             "rubber_leaf_fall", "banana_bunchy_top", "bacterial_leaf_blight"
         ]
+        self.disease_names = np.array(self.disease_classes, dtype=object)
 
-    async def detect_disease(self, image_path: str) -> Dict[str, Any]:
+    async def detect_disease(self, image: Media) -> Dict[str, Any]:
         """Detect crop diseases from image"""
         try:
-            # Load and preprocess image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError("Could not load image")
-
-            # Run YOLO detection
-            results = self.model(image)
-
-            detections = []
-            for detection in results:
-                boxes = detection.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        conf = float(box.conf.cpu().numpy())
-                        cls_id = int(box.cls.cpu().numpy())
-
-                        if conf > 0.5:  # Confidence threshold
-                            detections.append({
-                                "disease": self.disease_classes[cls_id],
-                                "confidence": conf,
-                                "bbox": box.xyxy.cpu().numpy().tolist()
-                            })
-
-            # Get the highest confidence detection
-            if detections:
-                best_detection = max(detections, key=lambda x: x["confidence"])
-                return {
-                    "detected_disease": best_detection["disease"],
-                    "confidence": best_detection["confidence"],
-                    "all_detections": detections
-                }
-            else:
-                return {
-                    "detected_disease": "healthy",
-                    "confidence": 0.6,
-                    "all_detections": []
-                }
+            return await self.batcher.submit(image)
 
         except Exception as e:
             logging.error(f"CV processing error: {str(e)}")
@@ -318,79 +724,495 @@ class CVProcessor:
                 "all_detections": []
             }
 
+    def _detect_batch(self, media: List[Media]) -> List[Any]:
+        """Blocking image decode, one batched YOLO forward pass and per-image post-processing"""
+        # Load and preprocess images
+        images = [decode_image(item) for item in media]
+        loaded = [image for image in images if image is not None]
+
+        # Run YOLO detection on every readable image at once
+        results = iter(self.model(loaded)) if loaded else iter(())
+
+        outputs = []
+        for image in images:
+            if image is None:
+                outputs.append(ValueError("Could not load image"))
+            else:
+                outputs.append(self._summarize(next(results)))
+        return outputs
+
+    def _summarize(self, detection) -> Dict[str, Any]:
+        """Turn one image's YOLO result into the detection summary"""
+        boxes = detection.boxes
+        if boxes is None or len(boxes) == 0:
+            return {
+                "detected_disease": "healthy",
+                "confidence": 0.6,
+                "all_detections": []
+            }
+
+        # One device-to-host copy per tensor for the whole result, not three per box
+        confidences = boxes.conf.cpu().numpy()
+        class_ids = boxes.cls.cpu().numpy().astype(np.int64)
+        bboxes = boxes.xyxy.cpu().numpy()
+
+        keep = confidences > 0.5  # Confidence threshold
+        if not keep.any():
+            return {
+                "detected_disease": "healthy",
+                "confidence": 0.6,
+                "all_detections": []
+            }
+
+        confidences = confidences[keep]
+        diseases = self.disease_names[class_ids[keep]]
+        # Each bbox keeps the per-box (1, 4) nesting of box.xyxy
+        bboxes = bboxes[keep][:, None, :]
+
+        # Get the highest confidence detection
+        best = int(np.argmax(confidences))
+
+        detections = [
+            {"disease": disease, "confidence": conf, "bbox": bbox}
+            for disease, conf, bbox in zip(diseases.tolist(), confidences.tolist(), bboxes.tolist())
+        ]
+        return {
+            "detected_disease": detections[best]["disease"],
+            "confidence": detections[best]["confidence"],
+            "all_detections": detections
+        }
+
+class EmbeddingCache:
+    """Bounded LRU of query embeddings keyed by the exact query string.
+
+    Optionally backed by Redis so replicas share embeddings. Each entry keeps
+    how long the embedding took to compute, which is credited to the
+    time-saved metric on every hit.
+    """
+
+    def __init__(self, client, max_entries: int, use_redis: bool, ttl: int):
+        self.client = client
+        self.max_entries = max_entries
+        self.use_redis = use_redis
+        self.ttl = ttl
+        self.local: OrderedDict = OrderedDict()
+
+    async def get(self, text: str) -> Optional[np.ndarray]:
+        entry = self.local.get(text)
+        if entry is not None:
+            self.local.move_to_end(text)
+            EMBEDDING_CACHE_REQUESTS.labels(tier="local", result="hit").inc()
+            EMBEDDING_SECONDS_SAVED.inc(entry[1])
+            return entry[0]
+        EMBEDDING_CACHE_REQUESTS.labels(tier="local", result="miss").inc()
+
+        if not self.use_redis:
+            return None
+        try:
+            raw = await self.client.get(self._redis_key(text))
+        except Exception as e:
+            logging.warning(f"Embedding cache lookup failed: {str(e)}")
+            raw = None
+        if raw is None:
+            EMBEDDING_CACHE_REQUESTS.labels(tier="redis", result="miss").inc()
+            return None
+
+        EMBEDDING_CACHE_REQUESTS.labels(tier="redis", result="hit").inc()
+        seconds, encoded = raw.split(":", 1)
+        vector = np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+        EMBEDDING_SECONDS_SAVED.inc(float(seconds))
+        self._store_local(text, vector, float(seconds))
+        return vector
+
+    async def set(self, text: str, vector: np.ndarray, seconds: float):
+        self._store_local(text, vector, seconds)
+        if not self.use_redis:
+            return
+        # The shared pool decodes responses, so vectors travel as base64 float32
+        encoded = base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+        try:
+            await self.client.setex(self._redis_key(text), self.ttl, f"{seconds:.6f}:{encoded}")
+        except Exception as e:
+            logging.warning(f"Embedding cache store failed: {str(e)}")
+
+    def _redis_key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{settings.EMBEDDING_MODEL_NAME}\n{text}".encode("utf-8")).hexdigest()
+        return f"embedding:{digest}"
+
+    def _store_local(self, text: str, vector: np.ndarray, seconds: float):
+        self.local[text] = (vector, seconds)
+        self.local.move_to_end(text)
+        while len(self.local) > self.max_entries:
+            self.local.popitem(last=False)
+
+embedding_cache = EmbeddingCache(redis_client, settings.EMBEDDING_CACHE_SIZE,
+                                 settings.EMBEDDING_CACHE_REDIS, settings.EMBEDDING_CACHE_TTL)
+
 class RAGProcessor:
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, embeddings_model, pool: StagePool,
+                 local_index: Optional[LocalVectorIndex] = None):
         self.vector_store = vector_store
-
-    async def retrieve_context(self, query: str, entities: Dict, k: int = 5) -> List[str]:
+        self.embeddings_model = embeddings_model
+        self.pool = pool
+        self.local_index = local_index
+        self.local_index_checked = time.monotonic()
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a query with the same model used for knowledge base retrieval"""
+        vector = await embedding_cache.get(query)
+        if vector is None:
+            start = time.perf_counter()
+            vector = np.asarray(await self.pool.run(self.embeddings_model.embed_query, query), dtype=np.float32)
+            await embedding_cache.set(query, vector, time.perf_counter() - start)
+        return vector.tolist()
+
+    @staticmethod
+    def enhance_query(query: str, entities: Dict) -> str:
+        """The query with its crops and diseases appended, as searched and embedded for retrieval"""
+        enhanced_query = query
+        if entities.get("crops"):
+            enhanced_query += " " + " ".join(entities["crops"])
+        if entities.get("diseases"):
+            enhanced_query += " " + " ".join(entities["diseases"])
+        return enhanced_query
+
+    async def retrieve_context(self, query: str, entities: Dict, k: int = 5,
+                               district: Optional[str] = None) -> List[str]:
         """Retrieve relevant context from knowledge base"""
+        return [passage["text"] for passage in await self.retrieve(query, entities, k, district)]
+
+    async def sparse_stage(self, query: str, entities: Dict, k: int = 5,
+                           district: Optional[str] = None) -> Dict[str, Any]:
+        """The BM25 half of retrieve(): {"docs", "skip_dense"}.
+
+        Exact pest and chemical names are found by BM25; a clear winner needs
+        no embedding. Callers that would otherwise embed the query check
+        skip_dense first, then hand the result to retrieve() as sparse.
+        """
+        try:
+            return await self._sparse_stage(self.enhance_query(query, entities),
+                                            k * settings.RAG_RERANK_FACTOR,
+                                            self._metadata_filters(entities, district))
+        except Exception as e:
+            logging.error(f"RAG sparse retrieval error: {str(e)}")
+            return {"docs": [], "skip_dense": False}
+
+    async def _sparse_stage(self, enhanced_query: str, candidates: int,
+                            filters: Dict[str, List[str]]) -> Dict[str, Any]:
+        mode = settings.RAG_RETRIEVAL_MODE
+        docs, confident = [], False
+        if mode in ("hybrid", "sparse"):
+            docs, confident = await self.sparse_search(enhanced_query, candidates, filters)
+        return {"docs": docs, "skip_dense": mode == "sparse" or (mode == "hybrid" and confident)}
+
+    async def retrieve(self, query: str, entities: Dict, k: int = 5,
+                       district: Optional[str] = None,
+                       embedding: Optional[List[float]] = None,
+                       sparse: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Context passages with the knowledge_base source each was chunked from.
+
+        embedding, when the caller already has it, must be of enhance_query(query, entities);
+        sparse is sparse_stage() for the same arguments, so BM25 is not run twice.
+        """
         try:
-            # Enhance query with entities
-            enhanced_query = query
-            if entities.get("crops"):
-                enhanced_query += " " + " ".join(entities["crops"])
-            if entities.get("diseases"):
-                enhanced_query += " " + " ".join(entities["diseases"])
+            enhanced_query = self.enhance_query(query, entities)
+            filters = self._metadata_filters(entities, district)
+            candidates = k * settings.RAG_RERANK_FACTOR
 
-            # Retrieve similar documents
-            docs = self.vector_store.similarity_search(enhanced_query, k=k)
+            if sparse is None:
+                sparse = await self._sparse_stage(enhanced_query, candidates, filters)
 
-            return [doc.page_content for doc in docs]
+            if sparse["skip_dense"]:
+                if settings.RAG_RETRIEVAL_MODE == "hybrid":
+                    EMBEDDINGS_SKIPPED.inc()
+                docs = sparse["docs"]
+            else:
+                docs = await self.dense_search(enhanced_query, k, candidates, filters, embedding)
+                if sparse["docs"]:
+                    docs = self._fuse(docs, sparse["docs"])
+
+            return [
+                {"text": doc.page_content, "source_id": doc.metadata.get("source_id")}
+                for doc in self._rerank(docs, entities, filters)[:k]
+            ]
 
         except Exception as e:
             logging.error(f"RAG retrieval error: {str(e)}")
             return []
 
+    async def dense_search(self, query: str, k: int, candidates: int,
+                           filters: Dict[str, List[str]],
+                           embedding: Optional[List[float]] = None) -> List[Document]:
+        """Vector search, reusing the cached embedding for repeated queries"""
+        if embedding is None:
+            embedding = await self.embed_query(query)
+        docs = await self.search(embedding, candidates, filters)
+        if filters and len(docs) < k:
+            # Too few tagged documents: top up with unfiltered results
+            seen = {doc.page_content for doc in docs}
+            docs += [doc for doc in await self.search(embedding, candidates) if doc.page_content not in seen]
+        return docs
+
+    async def sparse_search(self, query: str, k: int,
+                            filters: Dict[str, List[str]]) -> tuple:
+        """BM25 over the local snapshot; returns (documents, whether the top hit is confident)"""
+        await self._reload_local_index()
+        local = self.local_index
+        if local is None:
+            return [], False
+
+        hits = await self.pool.run(local.sparse_search, query, k, filters)
+        RETRIEVAL_REQUESTS.labels(backend="bm25").inc()
+        confident = bm25_is_confident(hits, settings.BM25_CONFIDENT_SCORE, settings.BM25_CONFIDENT_MARGIN)
+        return self._documents(local, hits), confident
+
+    @staticmethod
+    def _fuse(dense_docs: List[Document], sparse_docs: List[Document]) -> List[Document]:
+        """Reciprocal-rank fusion of dense and sparse results, keyed by chunk text"""
+        by_content = {doc.page_content: doc for doc in sparse_docs + dense_docs}
+        fused = reciprocal_rank_fusion(
+            [[doc.page_content for doc in dense_docs], [doc.page_content for doc in sparse_docs]],
+            k=settings.RRF_K
+        )
+        return [by_content[content] for content in fused]
+
+    @staticmethod
+    def _metadata_filters(entities: Dict, district: Optional[str]) -> Dict[str, List[str]]:
+        """Structured filters from NLU entities and the farmer's district.
+
+        Diseases are deliberately left out: NLU tags generic words like "disease",
+        so they are only used for re-ranking.
+        """
+        filters = {}
+        if entities.get("crops"):
+            filters["crops"] = entities["crops"]
+        if district:
+            filters["applicable_districts"] = [district]
+        if entities.get("season"):
+            filters["applicable_seasons"] = [entities["season"]]
+        return filters
+
+    @staticmethod
+    def _rerank(docs: List[Document], entities: Dict, filters: Dict[str, List[str]]) -> List[Document]:
+        """Stable sort putting documents explicitly tagged with the query's crops, district, season and diseases first"""
+        wanted = {field: set(metadata_tokens(values)) for field, values in filters.items()}
+        if entities.get("diseases"):
+            wanted["diseases"] = set(metadata_tokens(entities["diseases"]))
+        if not wanted:
+            return docs
+
+        def matches(doc: Document) -> int:
+            return sum(bool(set(metadata_tokens(doc.metadata.get(field))) & tokens) for field, tokens in wanted.items())
+
+        return sorted(docs, key=lambda doc: -matches(doc))
+
+    async def search(self, embedding: List[float], k: int,
+                     filters: Optional[Dict[str, List[str]]] = None) -> List[Document]:
+        """Search the local snapshot while it is fresh, otherwise Milvus, falling back to any snapshot"""
+        await self._reload_local_index()
+
+        local = self.local_index
+        if local is not None and (self.vector_store is None or not local.is_stale(settings.LOCAL_INDEX_MAX_AGE)):
+            return await self._search_local(embedding, k, filters)
+
+        try:
+            docs = await self.pool.run(self.vector_store.similarity_search_by_vector, embedding, k=k,
+                                       expr=milvus_filter_expr(filters or {}))
+            RETRIEVAL_REQUESTS.labels(backend="milvus").inc()
+            return docs
+        except Exception as e:
+            if local is None:
+                raise
+            logging.warning(f"Milvus search failed, serving stale local snapshot: {str(e)}")
+            return await self._search_local(embedding, k, filters)
+
+    async def _search_local(self, embedding: List[float], k: int,
+                            filters: Optional[Dict[str, List[str]]] = None) -> List[Document]:
+        local = self.local_index
+        hits = await self.pool.run(local.search, embedding, k, settings.LOCAL_INDEX_NPROBE, filters,
+                                   settings.LOCAL_INDEX_RESCORE_FACTOR)
+        RETRIEVAL_REQUESTS.labels(backend="local").inc()
+        LOCAL_INDEX_AGE.set(local.age_seconds())
+        return self._documents(local, hits)
+
+    @staticmethod
+    def _documents(local: LocalVectorIndex, hits: List[tuple]) -> List[Document]:
+        """Snapshot rows as Documents, matching what the Milvus store returns"""
+        documents = [local.document(row) for row, _ in hits]
+        return [Document(page_content=doc["text"], metadata=doc.get("metadata", {})) for doc in documents]
+
+    async def _reload_local_index(self):
+        """Pick up a newly exported snapshot without a restart"""
+        if time.monotonic() - self.local_index_checked < settings.LOCAL_INDEX_RELOAD_INTERVAL:
+            return
+        self.local_index_checked = time.monotonic()
+        if self.local_index is not None and not self.local_index.has_changed():
+            return
+        if not os.path.exists(os.path.join(settings.LOCAL_INDEX_PATH, "manifest.json")):
+            return
+        try:
+            self.local_index = await self.pool.run(LocalVectorIndex, settings.LOCAL_INDEX_PATH)
+            logging.info(f"Loaded local knowledge snapshot with {self.local_index.manifest['rows']} rows")
+        except Exception as e:
+            logging.error(f"Failed to reload local knowledge snapshot: {str(e)}")
+
+def load_safety_rules(path: str) -> Dict[str, Any]:
+    """Rules from a rules file, or from the "safety_rules" section of kerala_agriculture_data.json"""
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    return rules.get("safety_rules", rules)
+
 class SafetyValidator:
+    """Checks answers against the safety rules in a single scan.
+
+    Every banned, restricted and dosage-limited chemical, together with its
+    aliases (brand names, Malayalam transliterations) from the optional
+    "aliases" section of the rules, is compiled once into a case-folded
+    KeywordAutomaton. Dosages found in the same text are attributed to the
+    nearest chemical mention and checked against its dosage_limits.
+    """
+
     def __init__(self, safety_rules):
         self.safety_rules = safety_rules
+        # Changes whenever the rules change, so answers validated under old rules are not reused
+        self.version = hashlib.sha256(
+            json.dumps(safety_rules, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+        self.restrictions = {
+            rule["name"]: rule.get("restrictions", [])
+            for rule in safety_rules.get("restricted_pesticides", [])
+        }
+        self.automaton = KeywordAutomaton(self._terms())
+
+    def _terms(self) -> List[tuple]:
+        """(term, (rule type, chemical)) for every chemical name and alias"""
+        chemicals = [("banned", name) for name in self.safety_rules.get("banned_pesticides", [])]
+        chemicals += [("restricted", name) for name in self.restrictions]
+        chemicals += [("dosage_limited", name) for name in self.safety_rules.get("dosage_limits", {})]
+
+        aliases = self.safety_rules.get("aliases", {})
+        return [
+            (term, (rule_type, name))
+            for rule_type, name in chemicals
+            for term in [name] + aliases.get(name, [])
+        ]
+
+    def scan(self, response: str) -> List[Dict[str, Any]]:
+        """Every rule match in the response, with offsets into it for highlighting"""
+        return [
+            {"type": rule_type, "chemical": name, "start": start, "end": end, "text": response[start:end]}
+            for start, end, (rule_type, name) in self.automaton.find_all(response)
+        ]
+
+    def check_dosages(self, response: str, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Dosages in the response, each with the chemical it applies to and whether it is within limits"""
+        dosages = extract_dosages(response)
+        attribute(response, dosages, matches)
+        limits = self.safety_rules.get("dosage_limits", {})
+        for dosage in dosages:
+            limit = limits.get(dosage["chemical"], {})
+            exceeded = None
+            if dosage["kind"] == "applications":
+                if "max_applications" in limit and dosage["value"] > limit["max_applications"]:
+                    exceeded = f"{limit['max_applications']} applications"
+            elif "max_concentration" in limit:
+                percent = concentration_percent(dosage)
+                if percent is not None and percent > parse_percent(limit["max_concentration"]):
+                    exceeded = str(limit["max_concentration"])
+            dosage.update({"type": "dosage", "exceeds": exceeded})
+        return dosages
 
     def validate_response(self, response: str, entities: Dict) -> Dict[str, Any]:
-        """Validate response for safety violations"""
+        """Validate response for safety violations.
+
+        "text" is the NFC-normalized response that the match offsets index;
+        serve it in place of the original.
+        """
         violations = []
+        warnings = []
+        # Offsets from both scans index the same NFC text
+        response = unicodedata.normalize("NFC", response)
+        matches = self.scan(response)
+        dosages = self.check_dosages(response, matches)
+
+        for chemical in dict.fromkeys(match["chemical"] for match in matches if match["type"] == "banned"):
+            violations.append(f"Banned pesticide mentioned: {chemical}")
 
-        # Check for banned pesticides
-        for banned in self.safety_rules["banned_pesticides"]:
-            if banned.lower() in response.lower():
-                violations.append(f"Banned pesticide mentioned: {banned}")
+        # Restricted chemicals are allowed, but the restriction should reach the officer
+        for chemical in dict.fromkeys(match["chemical"] for match in matches if match["type"] == "restricted"):
+            warnings.extend(f"{chemical}: {restriction}" for restriction in self.restrictions[chemical])
 
-        # Check dosage recommendations
-        for pesticide, limits in self.safety_rules["dosage_limits"].items():
-            if pesticide.lower() in response.lower():
-                # In a real system, parse dosage mentions and validate
-                pass
+        for dosage in dosages:
+            if dosage["exceeds"]:
+                violations.append(f"Dosage above limit for {dosage['chemical']}: "
+                                  f"{dosage['text']} (max {dosage['exceeds']})")
 
         return {
             "is_safe": len(violations) == 0,
             "violations": violations,
+            "warnings": warnings,
+            "matches": sorted(matches + dosages, key=lambda match: match["start"]),
+            "text": response,
             "recommendation": "escalate" if violations else "allow"
         }
 
+class _FirstTokenTimer(BaseStreamer):
+    """Notes when generate() emits its first new token; its first put() is the prompt itself"""
+
+    def __init__(self):
+        self.prompt_seen = False
+        self.first_token_at = None
+
+    def put(self, value):
+        if not self.prompt_seen:
+            self.prompt_seen = True
+        elif self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def end(self):
+        pass
+
 class LLMProcessor:
-    def __init__(self, tokenizer, model):
-        self.tokenizer = tokenizer
-        self.model = model
+    """Answer generation with the advisor preamble's KV cache computed once.
 
-    async def generate_answer(self, query: str, context: List[str], entities: Dict, 
-                            farmer_location: str, language: str = "ml") -> Dict[str, Any]:
-        """Generate contextual answer using LLM"""
-        try:
-            # Prepare prompt
-            context_text = "\n\n".join(context[:3])  # Use top 3 contexts
+    Every prompt starts with the same SYSTEM_PROMPT. Its keys and values are
+    computed on first use and copied into each request's cache, so the
+    model only runs over the query, location and context tokens per request.
+    """
 
-            prompt = f"""You are an expert agricultural advisor for Kerala, India. 
+    SYSTEM_PROMPT = """You are an expert agricultural advisor for Kerala, India. 
 Respond in Malayalam. Answer the farmers question using the provided context.
 Be specific and practical.
 
-Query: {query}
+"""
+
+    def __init__(self, tokenizer, model, pool: StagePool):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.pool = pool
+        # The preamble and the request part are tokenized separately, so the cached ids are always a prefix
+        self.prefix_ids = tokenizer(self.SYSTEM_PROMPT, return_tensors="pt").input_ids.to(model.device)
+        self.prefix_cache = None
+        self.prefix_lock = threading.Lock()
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    @staticmethod
+    def build_prompt(query: str, context: List[str], farmer_location: str) -> str:
+        """The per-request part of the prompt, following SYSTEM_PROMPT"""
+        context_text = "\n\n".join(context[:3])  # Use top 3 contexts
+        return f"""Query: {query}
 Farmer Location: {farmer_location}
 Context: {context_text}
 
 Provide a clear, actionable answer in Malayalam:"""
 
-            # For this example, we will use a simplified response
-            # In production, use the actual LLM
-            response = self._generate_response_template(query, entities, context)
+    async def generate_answer(self, query: str, context: List[str], entities: Dict, 
+                            farmer_location: str, language: str = "ml") -> Dict[str, Any]:
+        """Generate contextual answer using LLM"""
+        try:
+            prompt = self.build_prompt(query, context, farmer_location)
+            response, _ = await self.pool.run(self.generate, prompt, settings.LLM_MAX_NEW_TOKENS,
+                                              settings.LLM_PREFIX_CACHE_ENABLED)
 
             return {
                 "answer": response,
@@ -408,20 +1230,118 @@ Provide a clear, actionable answer in Malayalam:"""
                 "sources": []
             }
 
-    def _generate_response_template(self, query: str, entities: Dict, context: List[str]) -> str:
-        """Generate template response based on entities"""
-        crops = entities.get("crops", [])
-        diseases = entities.get("diseases", [])
+    def generate(self, prompt: str, max_new_tokens: int, use_prefix_cache: bool = True) -> tuple:
+        """(answer, seconds to the first token) for SYSTEM_PROMPT followed by prompt"""
+        start = time.perf_counter()
+        prompt_ids = self.tokenizer(prompt, add_special_tokens=False, return_tensors="pt").input_ids
+        input_ids = torch.cat([self.prefix_ids, prompt_ids.to(self.model.device)], dim=1)
+
+        cache = {}
+        if use_prefix_cache:
+            # generate() extends the cache in place, so each request gets its own copy
+            cache["past_key_values"] = copy.deepcopy(self._prefix_cache())
+
+        timer = _FirstTokenTimer()
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                max_new_tokens=max_new_tokens, do_sample=False, streamer=timer,
+                pad_token_id=self.pad_token_id, **cache
+            )
+        ttft = (timer.first_token_at or time.perf_counter()) - start
+        LLM_TIME_TO_FIRST_TOKEN.labels(prefix_cache="on" if use_prefix_cache else "off").observe(ttft)
+
+        answer = self.tokenizer.decode(output[0, input_ids.shape[1]:], skip_special_tokens=True)
+        return answer.strip(), ttft
+
+    def _prefix_cache(self):
+        """KV cache of SYSTEM_PROMPT, computed by the first request that needs it"""
+        with self.prefix_lock:
+            if self.prefix_cache is None:
+                with torch.no_grad():
+                    self.prefix_cache = self.model(input_ids=self.prefix_ids, use_cache=True).past_key_values
+            return self.prefix_cache
+
+class InferenceClient:
+    """Forwards model calls to the in-pod inference process over a Unix socket.
+
+    Used in INFERENCE_MODE=remote so that every uvicorn worker shares one copy
+    of the model weights. Exposes the same coroutine methods as the local
+    processors, so it can stand in for any of the ASR, CV, RAG and LLM stages.
+    """
+
+    def __init__(self, socket_path: str, timeout: float):
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://inference",
+            timeout=timeout
+        )
+
+    async def _post(self, path: str, payload: Dict) -> Any:
+        response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post_media(self, path: str, media: Media) -> Any:
+        # Spilled uploads sit in the shared UPLOAD_DIR, so only their path is sent
+        if isinstance(media, str):
+            return await self._post(path, {"path": media})
+        response = await self.client.post(path, content=media,
+                                          headers={"Content-Type": "application/octet-stream"})
+        response.raise_for_status()
+        return response.json()
+
+    async def readiness(self) -> Dict[str, Any]:
+        response = await self.client.get("/health/ready")
+        return response.json()
+
+    async def process_voice(self, audio: Media) -> Dict[str, Any]:
+        return await self._post_media("/asr", audio)
+
+    async def detect_disease(self, image: Media) -> Dict[str, Any]:
+        return await self._post_media("/cv", image)
+
+    async def embed_query(self, query: str) -> List[float]:
+        return await self._post("/embed", {"query": query})
+
+    async def retrieve_context(self, query: str, entities: Dict, k: int = 5,
+                               district: Optional[str] = None) -> List[str]:
+        return [passage["text"] for passage in await self.retrieve(query, entities, k, district)]
+
+    async def sparse_stage(self, query: str, entities: Dict, k: int = 5,
+                           district: Optional[str] = None) -> Dict[str, Any]:
+        return await self._post("/rag/sparse", {"query": query, "entities": entities, "k": k, "district": district})
+
+    async def retrieve(self, query: str, entities: Dict, k: int = 5,
+                       district: Optional[str] = None,
+                       embedding: Optional[List[float]] = None,
+                       sparse: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # Documents do not cross the socket; the inference process repeats the (cheap) BM25 search
+        return await self._post("/rag", {"query": query, "entities": entities, "k": k, "district": district,
+                                         "embedding": embedding})
+
+    async def generate_answer(self, query: str, context: List[str], entities: Dict,
+                            farmer_location: str, language: str = "ml") -> Dict[str, Any]:
+        return await self._post("/llm", {
+            "query": query, "context": context, "entities": entities,
+            "farmer_location": farmer_location, "language": language
+        })
+
+inference_client = (
+    InferenceClient(settings.INFERENCE_SOCKET, settings.INFERENCE_TIMEOUT)
+    if settings.INFERENCE_MODE == "remote" else None
+)
 
-        if diseases and "blast" in diseases:
-            return "നെൽ ബ്ലാസ്റ്റ് രോഗത്തിന് കാർബെൻഡാസിം 0.1% സ്പ്രേ ചെയ്യുക. വാരത്തിൽ രണ്ടു തവണ പ്രയോഗിക്കുക. വെള്ളം നിൽക്കാതിരിക്കാൻ ശ്രദ്ധിക്കുക."
-        elif crops and "coconut" in crops:
-            return "തെങ്ങിന് നിരന്തരം പരിചരണം ആവശ്യമാണ്. ഇലകൾ മഞ്ഞയായാൽ റൂട്ട് ഫെഡിംഗ് നടത്തുക. കാൽസ്യം, മഗ്നീഷ്യം വേണ്ടുന്ന അളവിൽ നൽകുക."
-        else:
-            return "കൂടുതൽ വിവരങ്ങൾക്ക് ദയവായി കൃഷിഭവൻ ഉദ്യോഗസ്ഥനെ സമീപിക്കുക. ചിത്രവും അയച്ചാൽ നല്ലത്."
 
 # Main processing pipeline
 class QueryProcessor:
+    # Pipeline stages each query type needs before it can be served
+    REQUIRED_STAGES = {
+        "text": ("rag", "llm", "safety"),
+        "voice": ("asr", "rag", "llm", "safety"),
+        "image": ("cv", "rag", "llm", "safety"),
+    }
+
     def __init__(self):
         self.asr = None
         self.nlu = NLUProcessor()
@@ -429,26 +1349,129 @@ class QueryProcessor:
         self.rag = None
         self.safety = None
         self.llm = None
+        self._init_task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start attaching processors in the background and return immediately"""
+        if self._init_task is None:
+            self._init_task = asyncio.create_task(self.initialize())
+        return self._init_task
 
     async def initialize(self):
-        """Initialize all processors"""
-        self.asr = ASRProcessor(ml_models.whisper_model)
-        self.cv = CVProcessor(ml_models.yolo_model)
-        self.rag = RAGProcessor(ml_models.vector_store)
-        self.safety = SafetyValidator(ml_models.safety_rules)
-        self.llm = LLMProcessor(ml_models.llm_tokenizer, ml_models.llm_model)
+        """Initialize each processor as soon as the models it wraps are ready"""
+        stages = [
+            self._attach("safety", ("safety_rules",),
+                         lambda: report_safety_rules(SafetyValidator(ml_models.safety_rules))),
+        ]
+        if settings.INFERENCE_MODE == "remote":
+            stages.append(self._attach_remote(inference_client))
+        else:
+            stages.extend([
+                self._attach("asr", ("whisper",),
+                             lambda: ASRProcessor(ml_models.whisper_model, stage_pools["asr"])),
+                self._attach("cv", ("yolo",),
+                             lambda: CVProcessor(ml_models.yolo_model, stage_pools["cv"])),
+                self._attach_rag(),
+                self._attach("llm", ("llm",),
+                             lambda: LLMProcessor(ml_models.llm_tokenizer, ml_models.llm_model, stage_pools["llm"])),
+            ])
+        await asyncio.gather(*stages)
+
+    async def _attach(self, stage: str, models: tuple, factory):
+        if await ml_models.wait_loaded(*models):
+            setattr(self, stage, factory())
+            logging.info(f"Pipeline stage {stage} ready")
+
+    async def _attach_rag(self):
+        """RAG needs the embeddings plus Milvus or a local snapshot; either one is enough"""
+        if not await ml_models.wait_loaded("embeddings"):
+            return
+        await ml_models.wait_loaded("local_index")
+        if not ml_models.any_ready("local_index"):
+            # No snapshot: Milvus is the only retrieval backend
+            await ml_models.wait_loaded("vector_store")
+        if ml_models.any_ready("vector_store", "local_index"):
+            self.rag = RAGProcessor(ml_models.vector_store, ml_models.embeddings_model,
+                                    stage_pools["rag"], ml_models.local_index)
+            logging.info("Pipeline stage rag ready")
+            if ml_models.status["vector_store"] in ("pending", "loading", "retrying"):
+                # Serve from the snapshot now and switch fresh-data fallbacks to Milvus once it connects
+                if await ml_models.wait_loaded("vector_store"):
+                    self.rag.vector_store = ml_models.vector_store
+
+    async def _attach_remote(self, client: InferenceClient):
+        """Route model stages to the inference process as it reports them ready"""
+        pending = {"asr", "cv", "rag", "llm"}
+        while pending:
+            try:
+                ready = set((await client.readiness())["stages"]) & pending
+            except Exception as e:
+                logging.warning(f"Inference process not reachable yet: {str(e)}")
+                ready = set()
+
+            for stage in ready:
+                setattr(self, stage, client)
+                logging.info(f"Pipeline stage {stage} ready (remote)")
+            pending -= ready
+
+            if pending:
+                await asyncio.sleep(settings.INFERENCE_POLL_INTERVAL)
+
+    @staticmethod
+    def _short_circuit(nlu_result: Dict[str, Any]) -> bool:
+        """Cheap intents the classifier is sure of skip LLM generation"""
+        # confidence is the keyword rules' fixed value when the classifier was unsure; use its own probability
+        probabilities = nlu_result.get("intent_probabilities", {})
+        return (
+            nlu_result["intent"] in settings.SHORT_CIRCUIT_INTENTS
+            and probabilities.get(nlu_result["intent"], 0.0) >= settings.SHORT_CIRCUIT_MIN_PROBABILITY
+        )
+
+    def missing_stages(self, query_type: str) -> List[str]:
+        """Pipeline stages that are still loading for the given query type"""
+        return [stage for stage in self.REQUIRED_STAGES[query_type] if getattr(self, stage) is None]
+
+    @staticmethod
+    def _semantic_lookup(safety: SafetyValidator, partition: tuple, embedding: List[float],
+                         entities: Dict) -> Optional[Dict[str, Any]]:
+        """A semantically cached answer that still passes the current safety rules"""
+        hit = semantic_cache.lookup(partition, embedding)
+        if hit is None:
+            return None
+
+        value, similarity, llm_seconds = hit
+        safety_result = safety.validate_response(value["answer"], entities)
+        if not safety_result["is_safe"]:
+            SEMANTIC_CACHE_REQUESTS.labels(result="unsafe").inc()
+            return None
+
+        SEMANTIC_CACHE_REQUESTS.labels(result="hit").inc()
+        LLM_SECONDS_SAVED.inc(llm_seconds)
+        return {
+            **value,
+            "answer": safety_result["text"],
+            "is_escalated": False,
+            "escalation_reason": None,
+            "safety_violations": [],
+            "safety_warnings": safety_result["warnings"],
+            "safety_matches": safety_result["matches"],
+            "safety_rules_version": safety.version,
+            "semantic_similarity": similarity
+        }
 
     async def process_query(self, query_data: Dict) -> Dict[str, Any]:
         """Main query processing pipeline"""
         start_time = datetime.now()
+        # The rules can be swapped mid-request; one request uses one version throughout
+        safety = self.safety
 
         try:
             # Step 1: Process input based on type
             if query_data["query_type"] == "voice":
-                asr_result = await self.asr.process_voice(query_data["audio_path"])
+                asr_result = await self.asr.process_voice(query_data["audio"])
                 query_text = asr_result["text"]
             elif query_data["query_type"] == "image":
-                cv_result = await self.cv.detect_disease(query_data["image_path"])
+                cv_result = await self.cv.detect_disease(query_data["image"])
                 query_text = f"എന്റെ വിളയിൽ {cv_result['detected_disease']} രോഗം ഉണ്ടെന്ന് തോന്നുന്നു. എന്ത് ചെയ്യണം?"
             else:
                 query_text = query_data["query_text"]
@@ -456,17 +1479,82 @@ class QueryProcessor:
             # Step 2: Extract intent and entities
             nlu_result = await self.nlu.extract_intent_entities(query_text)
 
+            # Repeated questions are answered from the cache without RAG or the LLM
+            cache_key = None
+            if settings.ANSWER_CACHE_ENABLED:
+                cache_key = answer_cache.make_key(
+                    query_text, nlu_result["intent"], nlu_result["entities"],
+                    query_data.get("language", "ml"), query_data.get("district"), safety.version
+                )
+                cached = await answer_cache.get(cache_key)
+                if cached is not None:
+                    return {
+                        **cached,
+                        "query_text": query_text,
+                        "processing_time_ms": (datetime.now() - start_time).total_seconds() * 1000,
+                        "cache_hit": True
+                    }
+
+            # BM25 first: a confident hit needs no embedding, for the semantic cache or dense search
+            sparse = await self.rag.sparse_stage(
+                query_text, nlu_result["entities"], district=query_data.get("district")
+            )
+
+            # Differently worded versions of a cached question skip dense retrieval and the LLM too
+            query_embedding = None
+            # A near-identical question about another crop, disease or season must not reuse this answer
+            semantic_partition = (nlu_result["intent"], query_data.get("language", "ml"),
+                                  (query_data.get("district") or "").casefold(),
+                                  tuple(sorted(nlu_result["entities"].get("crops", []))),
+                                  tuple(sorted(nlu_result["entities"].get("diseases", []))),
+                                  nlu_result["entities"].get("season"))
+            if settings.SEMANTIC_CACHE_ENABLED and not sparse["skip_dense"]:
+                # The same string dense retrieval searches, so a cache miss reuses this embedding
+                query_embedding = await self.rag.embed_query(
+                    RAGProcessor.enhance_query(query_text, nlu_result["entities"])
+                )
+                semantic_hit = self._semantic_lookup(safety, semantic_partition, query_embedding,
+                                                     nlu_result["entities"])
+                if semantic_hit is not None:
+                    return {
+                        **semantic_hit,
+                        "query_text": query_text,
+                        "intent": nlu_result["intent"],
+                        "entities": nlu_result["entities"],
+                        "processing_time_ms": (datetime.now() - start_time).total_seconds() * 1000,
+                        "cache_hit": True
+                    }
+
             # Step 3: Retrieve relevant context
-            context = await self.rag.retrieve_context(query_text, nlu_result["entities"])
+            passages = await self.rag.retrieve(
+                query_text, nlu_result["entities"], district=query_data.get("district"),
+                embedding=query_embedding, sparse=sparse
+            )
+            context = [passage["text"] for passage in passages]
+            # Cached answers are invalidated when a knowledge_base source they cited is re-indexed
+            source_ids = sorted({passage["source_id"] for passage in passages if passage.get("source_id")})
 
             # Step 4: Generate answer
-            llm_result = await self.llm.generate_answer(
-                query_text, context, nlu_result["entities"],
-                query_data.get("farmer_location", "Kerala")
-            )
+            llm_start = time.perf_counter()
+            if self._short_circuit(nlu_result) and context:
+                # Prices and weather are stated by the advisories themselves; the LLM adds nothing
+                LLM_SHORT_CIRCUITS.labels(intent=nlu_result["intent"]).inc()
+                llm_result = {
+                    "answer": "\n\n".join(context[:2]),
+                    "confidence": nlu_result["intent_probabilities"][nlu_result["intent"]],
+                    "language": query_data.get("language", "ml"),
+                    "sources": context[:2]
+                }
+            else:
+                llm_result = await self.llm.generate_answer(
+                    query_text, context, nlu_result["entities"],
+                    query_data.get("farmer_location", "Kerala"),
+                    query_data.get("language", "ml")
+                )
+            llm_seconds = time.perf_counter() - llm_start
 
             # Step 5: Safety validation
-            safety_result = self.safety.validate_response(
+            safety_result = safety.validate_response(
                 llm_result["answer"], nlu_result["entities"]
             )
 
@@ -476,19 +1564,37 @@ class QueryProcessor:
                 not safety_result["is_safe"]
             )
 
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
-
-            return {
-                "query_text": query_text,
+            result = {
                 "intent": nlu_result["intent"],
                 "entities": nlu_result["entities"],
-                "answer": llm_result["answer"],
+                "answer": safety_result["text"],
                 "confidence": llm_result["confidence"],
                 "sources": llm_result["sources"],
                 "is_escalated": should_escalate,
                 "escalation_reason": "Low confidence" if llm_result["confidence"] < 0.5 else "Safety violation",
                 "safety_violations": safety_result["violations"],
-                "processing_time_ms": processing_time
+                "safety_warnings": safety_result["warnings"],
+                "safety_matches": safety_result["matches"],
+                "safety_rules_version": safety.version
+            }
+
+            # Only answers that went out without escalation are worth repeating
+            if cache_key is not None and not should_escalate:
+                await answer_cache.set(cache_key, nlu_result["intent"], result, source_ids)
+            if query_embedding is not None and not should_escalate:
+                semantic_cache.add(
+                    semantic_partition, query_embedding,
+                    {key: result[key] for key in ("answer", "confidence", "sources")},
+                    llm_seconds, answer_cache.ttl(nlu_result["intent"]), source_ids
+                )
+
+            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+
+            return {
+                **result,
+                "query_text": query_text,
+                "processing_time_ms": processing_time,
+                "cache_hit": False
             }
 
         except Exception as e:
@@ -501,18 +1607,184 @@ class QueryProcessor:
 
 query_processor = QueryProcessor()
 
+def report_safety_rules(validator: SafetyValidator) -> SafetyValidator:
+    SAFETY_RULES_VERSION.clear()
+    SAFETY_RULES_VERSION.labels(version=validator.version).set(1)
+    return validator
+
+class SafetyRulesReloader:
+    """Swaps new safety rules into the pipeline without a restart.
+
+    The rules file is checked every SAFETY_RULES_RELOAD_INTERVAL seconds
+    (a mounted ConfigMap update changes its inode and mtime), and a message
+    on the safety_rules:changed Redis channel makes every replica check at
+    once. A message may also carry the rules JSON itself, for a ban that
+    cannot wait for the file to propagate; it should be written to the file
+    too, or the next file change will replace it.
+
+    The new SafetyValidator is compiled in a thread and installed with one
+    assignment, so in-flight requests finish under the version they started
+    with. The version is part of every answer cache key, so answers checked
+    against the old rules stop being served from Redis; the in-process tiers
+    are cleared at once.
+    """
+
+    CHANNEL = "safety_rules:changed"
+
+    def __init__(self, processor: QueryProcessor, path: str, interval: float):
+        self.processor = processor
+        self.path = path
+        self.interval = interval
+        self.lock = asyncio.Lock()
+        self.file_signature = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self.file_signature = self._signature()
+        self.tasks = [asyncio.create_task(self._watch_file()), asyncio.create_task(self._listen())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+
+    async def publish(self, rules: Optional[Dict[str, Any]] = None):
+        """Ask every replica to reload, from the file or from the given rules"""
+        await redis_client.publish(self.CHANNEL, json.dumps(rules, ensure_ascii=False) if rules else "")
+
+    async def reload(self, rules: Optional[Dict[str, Any]] = None, origin: str = "file") -> bool:
+        """Compile the rules (read from the file when not given) and install them; True if they changed"""
+        async with self.lock:
+            current = self.processor.safety
+            try:
+                if rules is None:
+                    rules = await asyncio.to_thread(load_safety_rules, self.path)
+                else:
+                    rules = rules.get("safety_rules", rules)
+                validator = await asyncio.to_thread(SafetyValidator, rules)
+            except Exception as e:
+                SAFETY_RULES_RELOADS.labels(result="failed").inc()
+                logging.error(f"Safety rules reload from {origin} failed, keeping the current rules: {str(e)}")
+                return False
+
+            if current is not None and validator.version == current.version:
+                SAFETY_RULES_RELOADS.labels(result="unchanged").inc()
+                return False
+
+            self.processor.safety = validator
+            ml_models.safety_rules = rules
+            report_safety_rules(validator)
+            answer_cache.clear_local()
+            SAFETY_RULES_RELOADS.labels(result="applied").inc()
+            logging.info(f"Safety rules {current.version if current else None} -> {validator.version} "
+                         f"from {origin}")
+            return True
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    async def _watch_file(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = self._signature()
+            # Until the pipeline has attached its first validator, the loader will read the file itself
+            if signature is None or signature == self.file_signature or self.processor.safety is None:
+                continue
+            self.file_signature = signature
+            await self.reload(origin=self.path)
+
+    async def _listen(self):
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        rules = json.loads(message["data"]) if message["data"] else None
+                    except ValueError as e:
+                        logging.error(f"Ignoring malformed safety rules message: {str(e)}")
+                        continue
+                    await self.reload(rules, origin="redis" if rules else self.path)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Safety rules channel unavailable, retrying: {str(e)}")
+                await asyncio.sleep(self.interval)
+            finally:
+                await pubsub.reset()
+
+safety_rules_reloader = SafetyRulesReloader(query_processor, settings.SAFETY_RULES_PATH,
+                                            settings.SAFETY_RULES_RELOAD_INTERVAL)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize ML models and processors on startup"""
-    await ml_models.initialize()
-    await query_processor.initialize()
+    """Start loading ML models and processors in the background on startup"""
+    if settings.INFERENCE_MODE == "remote":
+        # Model weights live in the inference process; only safety rules are loaded per worker
+        ml_models.start_loading(("safety_rules",))
+    else:
+        ml_models.start_loading()
+    query_processor.start()
+    await safety_rules_reloader.start()
+    await media_archiver.start()
     logging.info("Digital Krishi Officer API started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued background work before the worker exits"""
+    await safety_rules_reloader.stop()
+    await media_archiver.stop()
+    await redis_pool.disconnect()
+
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check endpoint; fails once a model text queries need has exhausted its load retries"""
+    failed = ml_models.failed_required()
+    if failed:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "failed_models": failed, "timestamp": datetime.now().isoformat()}
+        )
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness check with per-model status; ready once text queries can be served"""
+    query_types = {
+        query_type: not query_processor.missing_stages(query_type)
+        for query_type in QueryProcessor.REQUIRED_STAGES
+    }
+    is_ready = query_types["text"]
+
+    models = ml_models.readiness()
+    if settings.INFERENCE_MODE == "remote":
+        try:
+            models.update((await inference_client.readiness())["models"])
+        except Exception as e:
+            logging.warning(f"Inference process readiness unavailable: {str(e)}")
+
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "status": "ready" if is_ready else "loading",
+            "models": models,
+            "query_types": query_types,
+            "safety_rules_version": query_processor.safety.version if query_processor.safety else None,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/auth/login")
 async def farmer_login(phone: str):
     """Farmer login with OTP"""
@@ -520,7 +1792,7 @@ async def farmer_login(phone: str):
     otp = str(uuid.uuid4().int)[:6]
 
     # Store OTP in Redis with expiry
-    redis_client.setex(f"otp:{phone}", 300, otp)  # 5 minutes expiry
+    await redis_client.setex(f"otp:{phone}", 300, otp)  # 5 minutes expiry
 
     # In production, send SMS via service like Twilio
     logging.info(f"OTP for {phone}: {otp}")
@@ -530,7 +1802,7 @@ async def farmer_login(phone: str):
 @app.post("/auth/verify")
 async def verify_otp(phone: str, otp: str, db: AsyncSession = Depends(get_db)):
     """Verify OTP and return access token"""
-    stored_otp = redis_client.get(f"otp:{phone}")
+    stored_otp = await redis_client.get(f"otp:{phone}")
 
     if not stored_otp or stored_otp != otp:
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
@@ -551,37 +1823,31 @@ async def process_farmer_query(
     """Main endpoint for processing farmer queries"""
     REQUEST_COUNT.labels(method="POST", endpoint="/query").inc()
 
+    missing = query_processor.missing_stages(request.query_type)
+    if missing:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Models still loading for {request.query_type} queries: {', '.join(missing)}",
+            headers={"Retry-After": "30"}
+        )
+
+    query_data = {
+        "farmer_id": request.farmer_id,
+        "query_type": request.query_type,
+        "query_text": request.query_text,
+        "farmer_location": f"{request.location_coordinates}" if request.location_coordinates else "Kerala",
+        "district": request.location_district,
+        "language": request.language
+    }
+
     with REQUEST_LATENCY.time():
         try:
-            query_data = {
-                "farmer_id": request.farmer_id,
-                "query_type": request.query_type,
-                "query_text": request.query_text,
-                "farmer_location": f"{request.location_coordinates}" if request.location_coordinates else "Kerala"
-            }
-
-            # Handle file uploads
+            # Handle file uploads in memory; only large uploads touch the disk
             if voice_file:
-                voice_path = f"/tmp/{uuid.uuid4()}.wav"
-                with open(voice_path, "wb") as f:
-                    content = await voice_file.read()
-                    f.write(content)
-                query_data["audio_path"] = voice_path
-
-                # Upload to S3
-                s3_key = f"audio/{uuid.uuid4()}.wav"
-                s3_client.upload_file(voice_path, settings.AWS_S3_BUCKET, s3_key)
+                query_data["audio"] = await read_upload(voice_file, ".wav")
 
             if image_file:
-                image_path = f"/tmp/{uuid.uuid4()}.jpg"
-                with open(image_path, "wb") as f:
-                    content = await image_file.read()
-                    f.write(content)
-                query_data["image_path"] = image_path
-
-                # Upload to S3
-                s3_key = f"images/{uuid.uuid4()}.jpg"
-                s3_client.upload_file(image_path, settings.AWS_S3_BUCKET, s3_key)
+                query_data["image"] = await read_upload(image_file, ".jpg")
 
             # Process query
             result = await query_processor.process_query(query_data)
@@ -604,13 +1870,27 @@ async def process_farmer_query(
                 confidence_score=result["confidence"],
                 source_citations=result.get("sources", []),
                 is_escalated=result["is_escalated"],
-                escalation_reason=result.get("escalation_reason")
+                escalation_reason=result.get("escalation_reason"),
+                safety_matches=result.get("safety_matches", []),
+                safety_rules_version=result.get("safety_rules_version")
             )
 
         except Exception as e:
             logging.error(f"Query processing error: {str(e)}")
             raise HTTPException(status_code=500, detail="Query processing failed")
 
+        finally:
+            try:
+                # Archive to S3 in the background; the archiver links spilled files it keeps
+                if query_data.get("audio") is not None:
+                    media_archiver.submit(query_data["audio"], "audio", ".wav")
+                if query_data.get("image") is not None:
+                    media_archiver.submit(query_data["image"], "images", ".jpg")
+            finally:
+                # Spilled uploads are removed whether or not they could be archived
+                remove_spilled(query_data.get("audio"))
+                remove_spilled(query_data.get("image"))
+
 @app.post("/escalate")
 async def escalate_to_officer(
     request: EscalationRequest,
@@ -627,6 +1907,15 @@ async def escalate_to_officer(
         "estimated_response_time": "2-4 hours"
     }
 
+@app.post("/nlu/batch")
+async def extract_batch(
+    request: NLUBatchRequest,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Intent and entities for many query texts in one call"""
+    results = await stage_pools["nlu"].run(query_processor.nlu.extract_batch, request.texts)
+    return {"results": results}
+
 @app.post("/feedback")
 async def submit_feedback(
     query_id: int,
@@ -675,6 +1964,21 @@ async def get_escalations(
     """Get escalated cases for officer"""
     return {"escalations": [], "total": 0}
 
+@app.post("/officer/safety-rules/reload")
+async def reload_safety_rules(current_user: Dict = Depends(get_current_user)):
+    """Re-read the safety rules file on every replica now, instead of at the next file check"""
+    await safety_rules_reloader.publish()
+    return {
+        "message": "Safety rules reload requested",
+        "version": query_processor.safety.version if query_processor.safety else None
+    }
+
+@app.post("/officer/answer-cache/invalidate")
+async def invalidate_answer_cache(current_user: Dict = Depends(get_current_user)):
+    """Drop every cached answer on every replica, e.g. after a full knowledge base ingest"""
+    await answer_cache.invalidate()
+    return {"message": "Answer cache invalidated", "generation": answer_cache.generation}
+
 @app.post("/officer/respond/{escalation_id}")
 async def officer_response(
     escalation_id: int,
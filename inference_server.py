@@ -0,0 +1,142 @@
+"""In-pod inference process for the Digital Krishi Officer API.
+
+Loads Whisper, YOLO, the RAG embeddings/vector store and the LLM exactly once
+and serves them over a Unix domain socket. API workers started with
+INFERENCE_MODE=remote call this process through InferenceClient instead of
+loading their own copy of every model, so adding uvicorn workers adds request
+concurrency without adding model memory.
+
+Run with:
+    python inference_server.py
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import start_http_server
+from pydantic import BaseModel
+
+from fastapi_backend import Media, QueryProcessor, settings, ml_models, query_processor
+
+MODEL_STAGES = ("asr", "cv", "rag", "llm")
+# Stages this process must serve before API workers can answer text queries
+TEXT_STAGES = tuple(stage for stage in QueryProcessor.REQUIRED_STAGES["text"] if stage in MODEL_STAGES)
+
+inference_app = FastAPI(
+    title="Digital Krishi Officer Inference",
+    description="Shared model weights for all API workers in the pod",
+    version="1.0.0"
+)
+
+# Request models
+class EmbedRequest(BaseModel):
+    query: str
+
+class RAGRequest(BaseModel):
+    query: str
+    entities: Dict[str, Any] = {}
+    k: int = 5
+    district: Optional[str] = None
+    embedding: Optional[List[float]] = None
+
+class LLMRequest(BaseModel):
+    query: str
+    context: List[str] = []
+    entities: Dict[str, Any] = {}
+    farmer_location: str = "Kerala"
+    language: str = "ml"
+
+async def read_media(request: Request) -> Media:
+    """Media arrives as raw bytes, or as a JSON path for uploads spilled to UPLOAD_DIR"""
+    if request.headers.get("content-type") == "application/json":
+        path = os.path.realpath((await request.json())["path"])
+        upload_dir = os.path.realpath(settings.UPLOAD_DIR)
+        # Only spilled uploads may be read by path, never arbitrary files
+        if os.path.commonpath([path, upload_dir]) != upload_dir:
+            raise HTTPException(status_code=400, detail="Media path must be inside UPLOAD_DIR")
+        return path
+    return await request.body()
+
+def get_stage(stage: str):
+    processor = getattr(query_processor, stage)
+    if processor is None:
+        raise HTTPException(status_code=503, detail=f"Stage {stage} is still loading",
+                            headers={"Retry-After": "30"})
+    return processor
+
+@inference_app.on_event("startup")
+async def startup_event():
+    """Load every model once, in this process only"""
+    # This process always owns the weights, whatever mode the API workers run in
+    settings.INFERENCE_MODE = "local"
+    # Stage pool and model metrics live in this process, so expose them on their own port
+    start_http_server(settings.INFERENCE_METRICS_PORT)
+    ml_models.start_loading()
+    query_processor.start()
+    logging.info(f"Inference process listening on {settings.INFERENCE_SOCKET}")
+
+@inference_app.get("/health/live")
+async def health_check():
+    """Liveness check; fails once a model text queries need has exhausted its load retries"""
+    failed = ml_models.failed_required()
+    if failed:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "failed_models": failed, "timestamp": datetime.now().isoformat()}
+        )
+    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+
+@inference_app.get("/health/ready")
+async def readiness_check():
+    """Per-model status and the model stages that can currently be served; ready once text stages are"""
+    stages = [stage for stage in MODEL_STAGES if getattr(query_processor, stage) is not None]
+    return JSONResponse(
+        status_code=200 if set(TEXT_STAGES) <= set(stages) else 503,
+        content={
+            "models": ml_models.readiness(),
+            "stages": stages,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+@inference_app.post("/asr")
+async def transcribe(request: Request):
+    return await get_stage("asr").process_voice(await read_media(request))
+
+@inference_app.post("/cv")
+async def detect(request: Request):
+    return await get_stage("cv").detect_disease(await read_media(request))
+
+@inference_app.post("/embed")
+async def embed(request: EmbedRequest):
+    return await get_stage("rag").embed_query(request.query)
+
+@inference_app.post("/rag")
+async def retrieve(request: RAGRequest):
+    return await get_stage("rag").retrieve(request.query, request.entities, k=request.k,
+                                           district=request.district, embedding=request.embedding)
+
+@inference_app.post("/rag/sparse")
+async def sparse_stage(request: RAGRequest):
+    result = await get_stage("rag").sparse_stage(request.query, request.entities, k=request.k,
+                                                 district=request.district)
+    return {"skip_dense": result["skip_dense"]}
+
+@inference_app.post("/llm")
+async def generate(request: LLMRequest):
+    return await get_stage("llm").generate_answer(
+        request.query, request.context, request.entities,
+        request.farmer_location, request.language
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # A socket left behind by a previous run would make the bind fail
+    if os.path.exists(settings.INFERENCE_SOCKET):
+        os.remove(settings.INFERENCE_SOCKET)
+    uvicorn.run(inference_app, uds=settings.INFERENCE_SOCKET)
@@ -0,0 +1,221 @@
+"""Character n-gram intent classifier for farmer queries.
+
+A multinomial logistic regression over hashed character 1-4-grams of the
+normalized query. Malayalam inflects by suffixing, so sub-word n-grams
+generalize across inflected forms that whole-word keywords miss. Scoring a
+query is a sum over a few hundred weight rows, well under a millisecond on
+CPU, and predict_proba scores a whole batch at once.
+
+Probabilities are calibrated with temperature scaling on a held-out split,
+so a threshold on them means what it says.
+
+Train with:
+    python intent_classifier.py train --data labelled_queries.jsonl --out ./models/intent_classifier.npz
+where each line is {"text": ..., "intent": ...}.
+"""
+
+import argparse
+import json
+import logging
+import math
+import unicodedata
+import zlib
+from typing import Dict, List, Iterable, Tuple
+
+import numpy as np
+
+INTENTS = (
+    "crop_disease_query", "pest_control_query", "fertilizer_query",
+    "weather_query", "market_price_query", "government_scheme_query",
+    "planting_advice_query", "harvesting_query"
+)
+NGRAM_RANGE = (1, 4)
+HASH_BITS = 18
+
+
+def ngram_features(text: str, hash_bits: int = HASH_BITS) -> Tuple[np.ndarray, np.ndarray]:
+    """(feature indices, L2-normalized log counts) of hashed character n-grams, words padded with spaces"""
+    text = " " + " ".join(unicodedata.normalize("NFC", text).casefold().split()) + " "
+    counts: Dict[int, int] = {}
+    mask = (1 << hash_bits) - 1
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for start in range(len(text) - n + 1):
+            index = zlib.crc32(text[start:start + n].encode("utf-8")) & mask
+            counts[index] = counts.get(index, 0) + 1
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    norm = np.linalg.norm(values)
+    return indices, values / norm if norm > 0 else values
+
+
+def batch_features(texts: Iterable[str], hash_bits: int = HASH_BITS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flattened (row ids, feature indices, values) for a batch of texts"""
+    rows, indices, values = [], [], []
+    for row, text in enumerate(texts):
+        text_indices, text_values = ngram_features(text, hash_bits)
+        rows.append(np.full(len(text_indices), row, dtype=np.int64))
+        indices.append(text_indices)
+        values.append(text_values)
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(indices), np.concatenate(values)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """Calibrated intent probabilities from a hashed n-gram linear model"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, intents: Tuple[str, ...] = INTENTS,
+                 temperature: float = 1.0):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.intents = tuple(intents)
+        self.temperature = float(temperature)
+        self.hash_bits = int(math.log2(len(weights)))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        data = np.load(path)
+        return cls(data["weights"], data["bias"], tuple(data["intents"].tolist()), float(data["temperature"]))
+
+    def save(self, path: str):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias,
+                            intents=np.array(self.intents), temperature=np.float32(self.temperature))
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        rows, indices, values = batch_features(texts, self.hash_bits)
+        logits = np.tile(self.bias, (len(texts), 1))
+        np.add.at(logits, rows, self.weights[indices] * values[:, None])
+        return logits
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), len(intents)) calibrated probabilities"""
+        return softmax(self.logits(texts) / self.temperature)
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float, Dict[str, float]]]:
+        """(best intent, its probability, all probabilities) per text"""
+        results = []
+        for probabilities in self.predict_proba(texts):
+            best = int(np.argmax(probabilities))
+            results.append((
+                self.intents[best], float(probabilities[best]),
+                {intent: float(p) for intent, p in zip(self.intents, probabilities)}
+            ))
+        return results
+
+
+def train(texts: List[str], labels: List[str], intents: Tuple[str, ...] = INTENTS, epochs: int = 60,
+          learning_rate: float = 0.5, l2: float = 1e-5, batch_size: int = 64,
+          validation_fraction: float = 0.15, seed: int = 0) -> Tuple[IntentClassifier, Dict[str, float]]:
+    """Fit by mini-batch SGD, then fit the temperature on the held-out split; returns (model, metrics)"""
+    rng = np.random.default_rng(seed)
+    label_ids = np.array([intents.index(label) for label in labels])
+    order = rng.permutation(len(texts))
+    held_out = max(1, int(len(texts) * validation_fraction)) if len(texts) > 10 else 0
+    validation, training = order[:held_out], order[held_out:]
+
+    features = [ngram_features(text) for text in texts]
+    weights = np.zeros((1 << HASH_BITS, len(intents)), dtype=np.float32)
+    bias = np.zeros(len(intents), dtype=np.float32)
+    model = IntentClassifier(weights, bias, intents)
+
+    for epoch in range(epochs):
+        rate = learning_rate / (1 + epoch / 10)
+        for start in range(0, len(training), batch_size):
+            batch = training[start:start + batch_size]
+            rows = np.concatenate([np.full(len(features[i][0]), row) for row, i in enumerate(batch)])
+            indices = np.concatenate([features[i][0] for i in batch])
+            values = np.concatenate([features[i][1] for i in batch])
+
+            logits = np.tile(model.bias, (len(batch), 1))
+            np.add.at(logits, rows, model.weights[indices] * values[:, None])
+            error = softmax(logits)
+            error[np.arange(len(batch)), label_ids[batch]] -= 1.0
+            error /= len(batch)
+
+            np.add.at(model.weights, indices, -rate * (values[:, None] * error[rows] + l2 * model.weights[indices]))
+            model.bias -= rate * error.sum(axis=0)
+        training = rng.permutation(training)
+
+    metrics = {"train_examples": float(len(training)), "validation_examples": float(len(validation))}
+    if len(validation):
+        validation_texts = [texts[i] for i in validation]
+        logits = model.logits(validation_texts)
+        model.temperature = fit_temperature(logits, label_ids[validation])
+        probabilities = model.predict_proba(validation_texts)
+        metrics.update({
+            "validation_accuracy": float((probabilities.argmax(axis=1) == label_ids[validation]).mean()),
+            "validation_nll": float(-np.log(probabilities[np.arange(len(validation)), label_ids[validation]]
+                                            + 1e-12).mean()),
+            "expected_calibration_error": expected_calibration_error(probabilities, label_ids[validation]),
+            "temperature": model.temperature
+        })
+    return model, metrics
+
+
+def fit_temperature(logits: np.ndarray, labels: np.ndarray) -> float:
+    """Temperature minimizing held-out negative log-likelihood"""
+    best, best_nll = 1.0, math.inf
+    for temperature in np.geomspace(0.01, 20, 300):
+        probabilities = softmax(logits / temperature)
+        nll = -np.log(probabilities[np.arange(len(labels)), labels] + 1e-12).mean()
+        if nll < best_nll:
+            best, best_nll = float(temperature), nll
+    return best
+
+
+def expected_calibration_error(probabilities: np.ndarray, labels: np.ndarray, bins: int = 10) -> float:
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    error = 0.0
+    for low in np.linspace(0, 1, bins, endpoint=False):
+        in_bin = (confidence > low) & (confidence <= low + 1 / bins)
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return float(error)
+
+
+def load_labelled(path: str) -> Tuple[List[str], List[str]]:
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"])
+                labels.append(example["intent"])
+    return texts, labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train and calibrate a classifier")
+    train_parser.add_argument("--data", required=True, help="JSONL of {\"text\", \"intent\"}")
+    train_parser.add_argument("--out", default="./models/intent_classifier.npz")
+    train_parser.add_argument("--epochs", type=int, default=60)
+
+    predict_parser = subparsers.add_parser("predict", help="Classify queries given on the command line")
+    predict_parser.add_argument("--model", default="./models/intent_classifier.npz")
+    predict_parser.add_argument("texts", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "train":
+        texts, labels = load_labelled(args.data)
+        unknown = sorted(set(labels) - set(INTENTS))
+        if unknown:
+            parser.error(f"Unknown intents in {args.data}: {unknown}")
+        model, metrics = train(texts, labels, epochs=args.epochs)
+        model.save(args.out)
+        logging.info(f"Saved {args.out}: {json.dumps(metrics)}")
+    else:
+        model = IntentClassifier.load(args.model)
+        for text, (intent, probability, _) in zip(args.texts, model.predict(args.texts)):
+            print(f"{probability:.3f}  {intent:<26} {text}")
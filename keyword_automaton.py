@@ -0,0 +1,97 @@
+"""Aho-Corasick multi-keyword matching.
+
+All keywords are compiled once into a single automaton, and a text is
+matched in one pass over its characters whatever the number of keywords, so
+gazetteers can grow to thousands of terms without slowing down each query.
+Matching is by substring, like `keyword in text`, on NFC-normalized,
+case-folded text. ASCII keywords only match whole words, so "rice" is not
+found in "price"; Malayalam keywords keep substring matching.
+"""
+
+import unicodedata
+from typing import Dict, List, Any, Iterable, Tuple
+
+
+def fold(text: str) -> str:
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def _is_word_char(text: str, index: int) -> bool:
+    return 0 <= index < len(text) and text[index].isascii() and text[index].isalnum()
+
+
+class KeywordAutomaton:
+    """Finds every occurrence of every keyword in a text; each keyword carries a payload"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        # State 0 is the root; goto[state] maps a character to the next state
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Per state, (keyword length, whole word, payload) for every keyword ending there, including via fail links
+        self.output: List[List[Tuple[int, bool, Any]]] = [[]]
+        self.size = 0
+
+        for keyword, payload in keywords:
+            keyword = fold(keyword)
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(keyword), keyword.isascii(), payload))
+            self.size += 1
+
+        self._link()
+
+    def _link(self):
+        """Breadth-first fail links: the longest proper suffix of each state that is also a prefix"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """(start, end, payload) for every keyword occurrence, in order of end position.
+
+        Offsets index the NFC form of text (text itself, for already composed
+        input), so text[start:end] is the matched span as written.
+        """
+        text = unicodedata.normalize("NFC", text)
+        folded = text.casefold()
+        origin = None
+        if len(folded) != len(text):
+            # Some characters fold to several (ß -> ss); map folded positions back to text
+            origin = [index for index, char in enumerate(text) for _ in char.casefold()]
+
+        matches = []
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, whole_word, payload in output[state]:
+                start, end = position + 1 - length, position + 1
+                if whole_word and (_is_word_char(folded, start - 1) or _is_word_char(folded, end)):
+                    continue
+                if origin is not None:
+                    start, end = origin[start], origin[end - 1] + 1
+                matches.append((start, end, payload))
+        return matches
+
+    def payloads(self, text: str) -> List[Any]:
+        """Distinct payloads found in the text, in order of first occurrence"""
+        return list(dict.fromkeys(payload for _, _, payload in self.find_all(text)))
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,492 @@
+"""Local snapshot index of the kerala_agri_knowledge vector collection.
+
+The knowledge base is small (tens of thousands of chunks), so a snapshot of
+the Milvus collection fits comfortably in each backend pod. Serving
+similarity search from it avoids a network round trip per query, keeps
+retrieval working through Milvus outages and lets retrieval be tested with
+no Milvus running.
+
+A snapshot is a directory holding the files below; the snapshot path is a
+symlink to the current one, so a new export replaces it atomically:
+    manifest.json      collection, row count, dimension, IVF layout, creation time
+    vectors.npy        float32 (rows, dim), unit-normalized, grouped by IVF list
+    list_offsets.npy   int64 (nlist + 1), first row of each IVF list
+    centroids.npy      float32 (nlist, dim), IVF centroids
+    documents.jsonl    one {"text": ..., "metadata": {...}} per row, same order
+    codes.npy          optional quantized copy of vectors.npy (int8 or packed sign bits)
+    code_scale.npy     per-dimension int8 scale, for int8 snapshots
+
+vectors.npy is memory-mapped, so processes on a node share its pages through
+the OS page cache. A BM25 inverted index over the same chunks is built at load
+time for sparse and hybrid retrieval.
+
+A quantized snapshot scans the 4x (int8) or 32x (binary) smaller codes to
+pick candidates, and re-scores only those against the float vectors, so the
+bulk of vectors.npy never needs to be resident.
+
+Build a snapshot from Milvus with:
+    python knowledge_index.py export --out ./data/knowledge_snapshot
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+# Below this many rows a flat scan is as fast as probing IVF lists
+IVF_MIN_ROWS = 2000
+QUANTIZATIONS = ("int8", "binary")
+
+# knowledge_base array columns carried as chunk metadata and usable as search filters
+FILTER_FIELDS = ("crops", "applicable_districts", "applicable_seasons")
+# Metadata values that mean "applies everywhere / all year"
+WILDCARD_TOKENS = {"all", "all_districts", "year_round"}
+
+
+# Atomic chillu letters spelled out as consonant + virama, so both spellings index alike
+CHILLU_DECOMPOSITION = str.maketrans({
+    "\u0d7a": "\u0d23\u0d4d",  # ൺ
+    "\u0d7b": "\u0d28\u0d4d",  # ൻ
+    "\u0d7c": "\u0d30\u0d4d",  # ർ
+    "\u0d7d": "\u0d32\u0d4d",  # ൽ
+    "\u0d7e": "\u0d33\u0d4d",  # ൾ
+    "\u0d7f": "\u0d15\u0d4d",  # ൿ
+    "\u200c": None,              # ZWNJ
+    "\u200d": None,              # ZWJ
+})
+TOKEN_PATTERN = re.compile(r"[\u0d00-\u0d7f]+|[0-9a-z\u00c0-\u024f]+")
+# Malayalam inflects by suffixing (നെൽ, നെല്ലിന്, നെല്ലിൽ), so words also index a
+# prefix term of this many code points to match across inflections
+MALAYALAM_STEM_LENGTH = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded words, plus a prefix stem term for each Malayalam word"""
+    text = unicodedata.normalize("NFC", text).casefold().translate(CHILLU_DECOMPOSITION)
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        tokens.append(word)
+        if "\u0d00" <= word[0] <= "\u0d7f":
+            tokens.append(word[:MALAYALAM_STEM_LENGTH] + "~")
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of tokenized chunks"""
+
+    def __init__(self, texts: Iterable[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+        self.size = len(lengths)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        avgdl = float(self.lengths.mean()) if self.size else 1.0
+        # Per-document length normalization, precomputed once
+        self.length_norm = k1 * (1 - b + b * self.lengths / max(avgdl, 1e-6))
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self.postings.items()
+        }
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (row, score) pairs, best first.
+
+        Scores are normalized by the score of an average-length document that
+        contains every query term once, and capped at 1, so a score is roughly
+        the share of the query's IDF weight that the document matches.
+        """
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or self.size == 0:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        max_score = 0.0
+        for term in terms:
+            ids, tfs = self.postings[term]
+            scores[ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.length_norm[ids])
+            max_score += self.idf[term]
+
+        if allowed is not None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[allowed] = True
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        k = min(k, len(candidates))
+        if k == 0:
+            return []
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), min(float(scores[row] / max_score), 1.0)) for row in top]
+
+
+def bm25_is_confident(hits: List[Tuple[int, float]], min_score: float, margin: float) -> bool:
+    """A strong, clear-cut BM25 winner, e.g. an exact pest or chemical name match"""
+    if not hits or hits[0][1] < min_score:
+        return False
+    return len(hits) == 1 or hits[0][1] >= margin * hits[1][1]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = 60) -> List[Any]:
+    """Merge ranked lists of hashable keys by summed 1 / (k + rank)"""
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda key: -scores[key])
+
+
+def metadata_token(value: str) -> str:
+    """Normalize a crop, district or season name so that "Black Pepper" matches black_pepper"""
+    return "_".join(str(value).casefold().replace("-", " ").split())
+
+
+def metadata_tokens(values: Any) -> List[str]:
+    if not values:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    return [metadata_token(value) for value in values]
+
+
+def milvus_filter_expr(filters: Dict[str, List[str]]) -> Optional[str]:
+    """Milvus boolean expression equivalent to LocalVectorIndex filtering"""
+    clauses = []
+    for field, values in filters.items():
+        tokens = sorted(set(metadata_tokens(values)) | WILDCARD_TOKENS)
+        quoted = ", ".join(json.dumps(token, ensure_ascii=False) for token in tokens)
+        clauses.append(f"(array_length({field}) == 0 or array_contains_any({field}, [{quoted}]))")
+    return " and ".join(clauses) or None
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension int8 codes; returns (codes, scale) with vectors ~= codes * scale"""
+    scale = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1])
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    return np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8), scale
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed eight to a byte"""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def hamming_similarity(codes: np.ndarray, query_code: np.ndarray, dim: int) -> np.ndarray:
+    """Sign agreement between packed codes and a packed query, scaled to [-1, 1] like cosine"""
+    difference = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        distance = np.bitwise_count(difference).sum(axis=1, dtype=np.int32)
+    else:
+        distance = _POPCOUNT[difference].sum(axis=1, dtype=np.int32)
+    return 1.0 - 2.0 * distance.astype(np.float32) / dim
+
+
+def train_ivf(vectors: np.ndarray, nlist: int, iterations: int = 10,
+              sample_size: int = 50000, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means over unit vectors; returns (centroids, list id per row)"""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > sample_size:
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for list_id in range(nlist):
+            members = sample[assignments == list_id]
+            if len(members):
+                centroids[list_id] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+def write_snapshot(path: str, vectors: np.ndarray, documents: List[Dict[str, Any]],
+                   collection: str, nlist: Optional[int] = None, quantization: Optional[str] = None):
+    """Write a snapshot atomically: readers see either the old or the new one.
+
+    The snapshot goes to a new directory next to path, and path, a symlink,
+    is then repointed at it with a single rename. The previous snapshot is
+    kept for readers still loading it; older ones are removed.
+
+    vectors is a (rows, dim) matrix; documents[i] is the text and metadata of row i.
+    quantization ("int8" or "binary") also stores quantized codes for two-stage search.
+    """
+    if quantization is not None and quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+    vectors = normalize_rows(vectors)
+    if nlist is None:
+        nlist = int(np.sqrt(len(vectors))) if len(vectors) >= IVF_MIN_ROWS else 1
+
+    if nlist > 1:
+        centroids, assignments = train_ivf(vectors, nlist)
+    else:
+        # A single list is searched with a flat scan; its centroid is never used
+        centroids = np.zeros((1, vectors.shape[1]), dtype=np.float32)
+        assignments = np.zeros(len(vectors), dtype=np.int64)
+
+    # Group rows by IVF list so each list is one contiguous slice
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).astype(np.int64)
+
+    path = os.path.abspath(path)
+    staging = f"{path}.snapshot-{int(time.time() * 1000)}-{os.getpid()}"
+    os.makedirs(staging)
+
+    np.save(os.path.join(staging, "vectors.npy"), vectors[order])
+    np.save(os.path.join(staging, "list_offsets.npy"), list_offsets)
+    np.save(os.path.join(staging, "centroids.npy"), centroids.astype(np.float32))
+    if quantization == "int8":
+        codes, scale = quantize_int8(vectors[order])
+        np.save(os.path.join(staging, "codes.npy"), codes)
+        np.save(os.path.join(staging, "code_scale.npy"), scale)
+    elif quantization == "binary":
+        np.save(os.path.join(staging, "codes.npy"), quantize_binary(vectors[order]))
+    with open(os.path.join(staging, "documents.jsonl"), "w", encoding="utf-8") as f:
+        for row in order:
+            f.write(json.dumps(documents[row], ensure_ascii=False) + "\n")
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "collection": collection,
+            "rows": int(len(vectors)),
+            "dim": int(vectors.shape[1]),
+            "nlist": int(nlist),
+            "quantization": quantization,
+            "created_at": time.time()
+        }, f, indent=2)
+
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A snapshot written as a plain directory by an older version: move it aside this once
+        previous = f"{path}.snapshot-legacy-{os.getpid()}"
+        os.rename(path, previous)
+    link = f"{path}.link-{os.getpid()}"
+    os.symlink(os.path.basename(staging), link)
+    os.replace(link, path)
+
+    # Also clears directories left behind by exports that crashed before the swap
+    parent, name = os.path.split(path)
+    for entry in os.listdir(parent):
+        candidate = os.path.join(parent, entry)
+        if entry.startswith(f"{name}.snapshot-") and candidate not in (staging, previous):
+            shutil.rmtree(candidate, ignore_errors=True)
+
+
+class LocalVectorIndex:
+    """IVF index over a memory-mapped snapshot, searched by cosine similarity"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Resolve the symlink once so every file comes from the same snapshot, even mid-swap
+        self.root = root = os.path.realpath(path)
+        with open(os.path.join(root, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.vectors = np.load(os.path.join(root, "vectors.npy"), mmap_mode="r")
+        self.list_offsets = np.load(os.path.join(root, "list_offsets.npy"))
+        self.centroids = np.load(os.path.join(root, "centroids.npy"))
+        self.quantization = self.manifest.get("quantization")
+        if self.quantization is not None:
+            self.codes = np.load(os.path.join(root, "codes.npy"), mmap_mode="r")
+        if self.quantization == "int8":
+            self.code_scale = np.load(os.path.join(root, "code_scale.npy"))
+        with open(os.path.join(root, "documents.jsonl"), "r", encoding="utf-8") as f:
+            self.documents = [json.loads(line) for line in f]
+        self.manifest_mtime = os.path.getmtime(os.path.join(root, "manifest.json"))
+        self._build_postings()
+        self.bm25 = BM25Index(document["text"] for document in self.documents)
+
+    def _build_postings(self):
+        """Per filter field: token -> rows tagged with it, plus rows that apply to everything"""
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        self.unrestricted: Dict[str, np.ndarray] = {}
+        for field in FILTER_FIELDS:
+            postings: Dict[str, List[int]] = {}
+            unrestricted = []
+            for row, document in enumerate(self.documents):
+                tokens = set(metadata_tokens(document.get("metadata", {}).get(field)))
+                if not tokens or tokens & WILDCARD_TOKENS:
+                    unrestricted.append(row)
+                for token in tokens:
+                    postings.setdefault(token, []).append(row)
+            self.postings[field] = {token: np.asarray(rows, dtype=np.int64) for token, rows in postings.items()}
+            self.unrestricted[field] = np.asarray(unrestricted, dtype=np.int64)
+
+    def filter_rows(self, filters: Dict[str, List[str]]) -> np.ndarray:
+        """Rows whose metadata matches every filter; untagged rows match any value"""
+        allowed = None
+        for field, values in filters.items():
+            if field not in self.postings:
+                continue
+            matching = [self.unrestricted[field]] + [
+                self.postings[field][token] for token in metadata_tokens(values) if token in self.postings[field]
+            ]
+            rows = np.unique(np.concatenate(matching))
+            allowed = rows if allowed is None else np.intersect1d(allowed, rows, assume_unique=True)
+        return np.arange(len(self.vectors)) if allowed is None else allowed
+
+    @property
+    def created_at(self) -> float:
+        return self.manifest["created_at"]
+
+    def age_seconds(self) -> float:
+        return time.time() - self.created_at
+
+    def is_stale(self, max_age: float) -> bool:
+        return self.age_seconds() > max_age
+
+    def has_changed(self) -> bool:
+        """True if a newer snapshot has been written to the same path"""
+        try:
+            root = os.path.realpath(self.path)
+            return root != self.root or os.path.getmtime(os.path.join(root, "manifest.json")) != self.manifest_mtime
+        except FileNotFoundError:
+            return False
+
+    def search(self, vector: Iterable[float], k: int, nprobe: int = 8,
+               filters: Optional[Dict[str, List[str]]] = None, rescore: int = 4) -> List[Tuple[int, float]]:
+        """Top-k (row, cosine similarity) pairs, best first.
+
+        With filters, only rows whose metadata matches are scanned (exactly,
+        without IVF probing, since the matching partition is usually small).
+        On a quantized snapshot the scan uses the codes, and the best
+        k * rescore candidates are re-scored exactly; rescore=0 skips that.
+        """
+        if len(self.vectors) == 0:
+            return []
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        scan = self._scanner(query)
+
+        nlist = len(self.list_offsets) - 1
+        if filters:
+            rows = self.filter_rows(filters)
+            scores = scan(rows) if len(rows) else np.zeros(0, dtype=np.float32)
+        elif nlist <= 1 or nprobe >= nlist:
+            rows = np.arange(len(self.vectors))
+            scores = scan(slice(None))
+        else:
+            centroid_scores = self.centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            rows = np.concatenate([
+                np.arange(self.list_offsets[list_id], self.list_offsets[list_id + 1]) for list_id in probe
+            ])
+            scores = np.concatenate([
+                scan(slice(self.list_offsets[list_id], self.list_offsets[list_id + 1])) for list_id in probe
+            ])
+
+        if self.quantization is not None and rescore > 0:
+            # Fancy indexing the memory map reads only the candidate rows, in file order
+            rows = np.sort(rows[self._top(scores, k * rescore)])
+            scores = self.vectors[rows] @ query
+
+        return [(int(rows[i]), float(scores[i])) for i in self._top(scores, k)]
+
+    def _scanner(self, query: np.ndarray):
+        """Function scoring a slice or index array of rows against the query, on codes if quantized"""
+        if self.quantization == "int8":
+            # Fold the scale into the query so codes are only widened, never rescaled
+            scaled_query = query * self.code_scale
+            return lambda rows: self.codes[rows].astype(np.float32) @ scaled_query
+        if self.quantization == "binary":
+            query_code = quantize_binary(query)
+            dim = self.vectors.shape[1]
+            return lambda rows: hamming_similarity(self.codes[rows], query_code, dim)
+        return lambda rows: self.vectors[rows] @ query
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores, best first"""
+        k = min(k, len(scores))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def sparse_search(self, query: str, k: int,
+                      filters: Optional[Dict[str, List[str]]] = None) -> List[Tuple[int, float]]:
+        """Top-k BM25 (row, normalized score) pairs, restricted to rows matching filters"""
+        allowed = self.filter_rows(filters) if filters else None
+        return self.bm25.search(query, k, allowed)
+
+    def document(self, row: int) -> Dict[str, Any]:
+        return self.documents[row]
+
+
+def export_milvus_snapshot(path: str, host: str, port: int, collection_name: str,
+                           text_field: str = "text", vector_field: str = "vector",
+                           batch_size: int = 1000, nlist: Optional[int] = None,
+                           quantization: Optional[str] = None) -> int:
+    """Copy every row of a Milvus collection into a local snapshot; returns the row count"""
+    from pymilvus import Collection, connections
+
+    connections.connect(host=host, port=port)
+    collection = Collection(collection_name)
+    collection.load()
+
+    vectors, documents = [], []
+    iterator = collection.query_iterator(batch_size=batch_size, output_fields=["*"])
+    while True:
+        batch = iterator.next()
+        if not batch:
+            iterator.close()
+            break
+        for row in batch:
+            vectors.append(np.asarray(row.pop(vector_field), dtype=np.float32))
+            documents.append({"text": row.pop(text_field), "metadata": row})
+
+    dim = len(vectors[0]) if vectors else 0
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+    write_snapshot(path, matrix, documents, collection_name, nlist=nlist, quantization=quantization)
+    return len(documents)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Snapshot a Milvus collection to a local index")
+    export.add_argument("--out", default=os.getenv("LOCAL_INDEX_PATH", "./data/knowledge_snapshot"))
+    export.add_argument("--host", default=os.getenv("MILVUS_HOST", "milvus"))
+    export.add_argument("--port", type=int, default=int(os.getenv("MILVUS_PORT", "19530")))
+    export.add_argument("--collection", default="kerala_agri_knowledge")
+    export.add_argument("--nlist", type=int, default=None, help="IVF lists (default: sqrt(rows))")
+    export.add_argument("--quantization", choices=QUANTIZATIONS, default=None,
+                        help="also store quantized codes for two-stage search")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    rows = export_milvus_snapshot(args.out, args.host, args.port, args.collection, nlist=args.nlist,
+                                  quantization=args.quantization)
+    logging.info(f"Exported {rows} rows to {args.out} in {time.perf_counter() - start:.1f}s")
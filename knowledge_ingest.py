@@ -0,0 +1,316 @@
+"""Streaming ingestion of agricultural knowledge into the kerala_agri_knowledge collection.
+
+Documents are read one at a time from the knowledge_base table or from
+JSONL/CSV exports of it, split into chunks, embedded in batches on several
+worker processes and bulk-inserted into Milvus. At most a few batches of
+chunks are held in memory at once, whatever the size of the source.
+
+After each inserted batch a checkpoint records the last fully ingested
+document (knowledge_base.id, or the record number within a file), so an
+interrupted run continues where it stopped with --resume.
+
+Run with:
+    python knowledge_ingest.py --source db --workers 4
+    python knowledge_ingest.py --source file --path knowledge.jsonl --resume
+
+Afterwards, refresh the local snapshot with `python knowledge_index.py export`
+and drop answers cached from the old content with
+`POST /officer/answer-cache/invalidate`.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from knowledge_index import metadata_tokens, normalize_rows
+
+# knowledge_base array columns, stored as Milvus VARCHAR arrays of metadata tokens
+ARRAY_FIELDS = ("crops", "diseases", "pests", "applicable_districts", "applicable_seasons")
+# knowledge_base scalar columns carried as chunk metadata
+SCALAR_FIELDS = ("title", "content_type", "source", "source_url", "language")
+KNOWLEDGE_BASE_COLUMNS = ("id",) + SCALAR_FIELDS + ("content",) + ARRAY_FIELDS
+
+MAX_TEXT_LENGTH = 65535
+MAX_ARRAY_CAPACITY = 64
+
+# Vector index per --quantization; IVF_SQ8 stores int8 codes, a quarter of the float index.
+# Cosine, like the local snapshot, so both backends rank the same chunks first; collections
+# created with an earlier L2 index keep it until they are dropped and re-ingested
+INDEX_PARAMS = {
+    None: {"metric_type": "COSINE", "index_type": "HNSW", "params": {"M": 8, "efConstruction": 64}},
+    "int8": {"metric_type": "COSINE", "index_type": "IVF_SQ8", "params": {"nlist": 1024}},
+}
+
+
+def source_document(record: Dict[str, Any], source_id: str) -> Dict[str, Any]:
+    """A knowledge_base row (or file record with the same fields) in ingestion form"""
+    metadata = {"source_id": source_id}
+    for field in SCALAR_FIELDS:
+        metadata[field] = str(record.get(field) or "")
+    for field in ARRAY_FIELDS:
+        values = record.get(field)
+        if isinstance(values, str) and values.startswith("["):
+            values = json.loads(values)
+        elif isinstance(values, str):
+            # CSV exports carry arrays as "Rice;Coconut"
+            values = [value for value in values.split(";") if value.strip()]
+        metadata[field] = metadata_tokens(values)[:MAX_ARRAY_CAPACITY]
+    return {"content": record.get("content") or "", "metadata": metadata}
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """The backend's SQLAlchemy URL in the form asyncpg accepts"""
+    return database_url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+# Sources: generators of (position, document); position is what the checkpoint stores
+def iter_knowledge_base(database_url: str, after_id: int = 0,
+                        page_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream knowledge_base rows in id order with keyset pagination, one page in memory at a time"""
+    import asyncpg
+
+    loop = asyncio.new_event_loop()
+    connection = loop.run_until_complete(asyncpg.connect(asyncpg_dsn(database_url)))
+    query = (f"SELECT {', '.join(KNOWLEDGE_BASE_COLUMNS)} FROM knowledge_base "
+             f"WHERE id > $1 ORDER BY id LIMIT $2")
+    try:
+        while True:
+            rows = loop.run_until_complete(connection.fetch(query, after_id, page_size))
+            if not rows:
+                break
+            for row in rows:
+                after_id = row["id"]
+                yield after_id, source_document(dict(row), f"kb:{after_id}")
+    finally:
+        loop.run_until_complete(connection.close())
+        loop.close()
+
+
+def iter_file(path: str, after: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream records from a .jsonl or .csv export of knowledge_base, skipping the first `after`"""
+    name = os.path.basename(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+
+        for position, record in enumerate(records, start=1):
+            if position <= after:
+                continue
+            source_id = f"kb:{record['id']}" if record.get("id") else f"{name}:{position}"
+            yield position, source_document(record, source_id)
+
+
+def chunk_batches(documents: Iterator[Tuple[int, Dict[str, Any]]], splitter: RecursiveCharacterTextSplitter,
+                  batch_size: int) -> Iterator[Tuple[Any, List[Dict[str, Any]]]]:
+    """Group chunks into batches of about batch_size without splitting a document across batches.
+
+    Each batch comes with the position of its last document, so a checkpoint
+    taken after the batch is inserted never points into a half-ingested document.
+    """
+    batch, position = [], None
+    for position, document in documents:
+        for text in splitter.split_text(document["content"]):
+            batch.append({"text": text[:MAX_TEXT_LENGTH], **document["metadata"]})
+        if len(batch) >= batch_size:
+            yield position, batch
+            batch = []
+    if batch:
+        yield position, batch
+
+
+# Embedding worker processes, each with its own copy of the model
+_embedder = None
+
+
+def _init_embedder(model_name: str, threads: int):
+    global _embedder
+    import torch
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    # Split the cores between workers instead of every worker claiming all of them
+    torch.set_num_threads(threads)
+    _embedder = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_texts(texts: List[str]) -> np.ndarray:
+    # Unit vectors, as the local snapshot stores them
+    return normalize_rows(np.asarray(_embedder.embed_documents(texts), dtype=np.float32))
+
+
+class MilvusSink:
+    """Bulk inserts into a Milvus collection with the schema the backend's Milvus store reads"""
+
+    def __init__(self, host: str, port: int, collection_name: str, quantization: Optional[str] = None):
+        from pymilvus import Collection, connections, utility
+
+        connections.connect(host=host, port=port)
+        self.collection_name = collection_name
+        self.index_params = INDEX_PARAMS[quantization]
+        self.collection = Collection(collection_name) if utility.has_collection(collection_name) else None
+
+    def _create_collection(self, dim: int):
+        from pymilvus import Collection, CollectionSchema, DataType, FieldSchema
+
+        fields = [
+            FieldSchema("pk", DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema("text", DataType.VARCHAR, max_length=MAX_TEXT_LENGTH),
+            FieldSchema("vector", DataType.FLOAT_VECTOR, dim=dim),
+            FieldSchema("source_id", DataType.VARCHAR, max_length=128),
+        ]
+        # Milvus VARCHAR lengths are in bytes; Malayalam takes three per character
+        fields += [FieldSchema(field, DataType.VARCHAR, max_length=2048) for field in SCALAR_FIELDS]
+        fields += [FieldSchema(field, DataType.ARRAY, element_type=DataType.VARCHAR,
+                               max_capacity=MAX_ARRAY_CAPACITY, max_length=256)
+                   for field in ARRAY_FIELDS]
+        self.collection = Collection(self.collection_name, CollectionSchema(fields))
+        self.collection.create_index("vector", self.index_params)
+        logging.info(f"Created collection {self.collection_name} (dim {dim}, {self.index_params['index_type']})")
+
+    def delete_sources(self, source_ids: List[str]):
+        """Drop chunks of the given documents, e.g. ones a crashed run inserted after its last checkpoint"""
+        if self.collection is None or not source_ids:
+            return
+        quoted = ", ".join(json.dumps(source_id) for source_id in source_ids)
+        self.collection.delete(f"source_id in [{quoted}]")
+
+    def insert(self, chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        if self.collection is None:
+            self._create_collection(vectors.shape[1])
+        rows = [{**chunk, "vector": vector} for chunk, vector in zip(chunks, vectors.tolist())]
+        self.collection.insert(rows)
+
+    def flush(self):
+        if self.collection is not None:
+            self.collection.flush()
+
+
+def read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    staging = f"{path}.tmp"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(staging, path)
+
+
+def ingest(documents: Iterator[Tuple[Any, Dict[str, Any]]], sink: MilvusSink, model_name: str,
+           checkpoint_path: str, source: str, workers: int = 2, batch_size: int = 256,
+           chunk_size: int = 1000, chunk_overlap: int = 100,
+           resumed: Optional[Dict[str, Any]] = None, replace: bool = False) -> Dict[str, Any]:
+    """Chunk, embed and insert a stream of (position, document); returns the final checkpoint.
+
+    Batches are embedded on `workers` processes with at most two batches
+    queued per worker, and inserted in source order so the checkpoint only
+    ever moves past documents whose chunks are all in Milvus. With replace,
+    existing chunks of every document are deleted before its new ones are
+    inserted, turning the run into an upsert.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    checkpoint = resumed or {"source": source, "position": None, "documents": 0, "chunks": 0}
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = time.perf_counter()
+    documents_this_run = 0
+
+    # Chunks of the first batch may already be in Milvus if the previous run died before checkpointing
+    dedupe_first_batch = resumed is not None
+
+    with ProcessPoolExecutor(workers, initializer=_init_embedder, initargs=(model_name, threads)) as executor:
+        pending = deque()
+
+        def drain(limit: int):
+            nonlocal dedupe_first_batch, documents_this_run
+            while len(pending) > limit:
+                position, batch, future = pending.popleft()
+                vectors = future.result()
+                source_ids = list(dict.fromkeys(chunk["source_id"] for chunk in batch))
+                if replace or dedupe_first_batch:
+                    sink.delete_sources(source_ids)
+                    dedupe_first_batch = False
+                sink.insert(batch, vectors)
+
+                documents_this_run += len(source_ids)
+                checkpoint.update({
+                    "position": position,
+                    "documents": checkpoint["documents"] + len(source_ids),
+                    "chunks": checkpoint["chunks"] + len(batch),
+                    "updated_at": time.time()
+                })
+                write_checkpoint(checkpoint_path, checkpoint)
+
+                elapsed = time.perf_counter() - start
+                logging.info(f"Ingested {checkpoint['documents']} documents / {checkpoint['chunks']} chunks "
+                             f"(position {position}), {documents_this_run / elapsed:.1f} docs/s")
+
+        for position, batch in chunk_batches(documents, splitter, batch_size):
+            future = executor.submit(_embed_texts, [chunk["text"] for chunk in batch])
+            pending.append((position, batch, future))
+            drain(2 * workers)
+        drain(0)
+
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    checkpoint["docs_per_second"] = documents_this_run / elapsed if elapsed else 0.0
+    write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=("db", "file"), default="db")
+    parser.add_argument("--path", help="JSONL or CSV export of knowledge_base (--source file)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL",
+                                                            "postgresql+asyncpg://user:pass@db:5432/krishi_db"))
+    parser.add_argument("--host", default=os.getenv("MILVUS_HOST", "milvus"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MILVUS_PORT", "19530")))
+    parser.add_argument("--collection", default="kerala_agri_knowledge")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME",
+                                                     "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"))
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="embedding processes")
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding batch")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--checkpoint", default="./data/ingest_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--quantization", choices=("int8",), default=None,
+                        help="index vectors with IVF_SQ8 when creating the collection")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.source == "file" and not args.path:
+        parser.error("--path is required with --source file")
+    source = f"file:{os.path.abspath(args.path)}" if args.source == "file" else "db:knowledge_base"
+
+    resumed = read_checkpoint(args.checkpoint) if args.resume else None
+    if resumed and resumed.get("source") != source:
+        parser.error(f"Checkpoint {args.checkpoint} belongs to {resumed.get('source')}, not {source}")
+    after = (resumed or {}).get("position") or 0
+
+    if args.source == "db":
+        documents = iter_knowledge_base(args.database_url, after_id=after)
+    else:
+        documents = iter_file(args.path, after=after)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.checkpoint)), exist_ok=True)
+    sink = MilvusSink(args.host, args.port, args.collection, quantization=args.quantization)
+    result = ingest(documents, sink, args.model, args.checkpoint, source, workers=args.workers,
+                    batch_size=args.batch_size, chunk_size=args.chunk_size,
+                    chunk_overlap=args.chunk_overlap, resumed=resumed)
+    logging.info(f"Done: {result['documents']} documents, {result['chunks']} chunks, "
+                 f"{result['docs_per_second']:.1f} docs/s")
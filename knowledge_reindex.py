@@ -0,0 +1,302 @@
+"""Incremental re-indexing of knowledge_base into the kerala_agri_knowledge collection.
+
+Only rows whose last_updated is past the stored watermark are re-chunked,
+re-embedded and upserted (their old chunks are deleted first, since an edit
+can change the number of chunks). Deleted rows are recorded in
+knowledge_base_deletions by a trigger and their vectors removed. Cached
+answers that cited any changed or deleted row are invalidated on every
+replica.
+
+Runs every --interval seconds, and immediately (after a short debounce)
+when the triggers send a knowledge_base_changed notification. A cycle that
+fails (a dropped Postgres or Redis connection) is logged and retried with
+backoff; invalidations not yet published stay in the checkpoint until they are.
+
+Run with:
+    python knowledge_reindex.py --install-triggers   # once per database
+    python knowledge_reindex.py --interval 300
+    python knowledge_reindex.py --once
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from caches import answer_cache, redis_pool
+from config import settings
+from knowledge_index import export_milvus_snapshot
+from knowledge_ingest import (
+    KNOWLEDGE_BASE_COLUMNS, MilvusSink, asyncpg_dsn, ingest, read_checkpoint, source_document, write_checkpoint
+)
+
+NOTIFY_CHANNEL = "knowledge_base_changed"
+SOURCE = "db:knowledge_base:incremental"
+
+TRIGGER_SQL = f"""
+CREATE TABLE IF NOT EXISTS knowledge_base_deletions (
+    id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_knowledge_deletions_at ON knowledge_base_deletions (deleted_at);
+
+CREATE OR REPLACE FUNCTION knowledge_base_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.last_updated := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION knowledge_base_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO knowledge_base_deletions (id) VALUES (OLD.id)
+            ON CONFLICT (id) DO UPDATE SET deleted_at = NOW();
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', OLD.id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('{NOTIFY_CHANNEL}', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS knowledge_base_touch ON knowledge_base;
+CREATE TRIGGER knowledge_base_touch BEFORE UPDATE ON knowledge_base
+    FOR EACH ROW EXECUTE FUNCTION knowledge_base_touch();
+
+DROP TRIGGER IF EXISTS knowledge_base_changed ON knowledge_base;
+CREATE TRIGGER knowledge_base_changed AFTER INSERT OR UPDATE OR DELETE ON knowledge_base
+    FOR EACH ROW EXECUTE FUNCTION knowledge_base_changed();
+"""
+
+
+def iter_changed(database_url: str, since: datetime, after_id: int = 0,
+                 page_size: int = 500) -> Iterator[Tuple[List[Any], Dict[str, Any]]]:
+    """Stream rows updated after (since, after_id) in (last_updated, id) order, via idx_knowledge_updated"""
+    import asyncpg
+
+    loop = asyncio.new_event_loop()
+    connection = loop.run_until_complete(asyncpg.connect(asyncpg_dsn(database_url)))
+    query = (f"SELECT last_updated, {', '.join(KNOWLEDGE_BASE_COLUMNS)} FROM knowledge_base "
+             f"WHERE (last_updated, id) > ($1, $2) ORDER BY last_updated, id LIMIT $3")
+    try:
+        while True:
+            rows = loop.run_until_complete(connection.fetch(query, since, after_id, page_size))
+            if not rows:
+                break
+            for row in rows:
+                since, after_id = row["last_updated"], row["id"]
+                yield [since.isoformat(), after_id], source_document(dict(row), f"kb:{after_id}")
+    finally:
+        loop.run_until_complete(connection.close())
+        loop.close()
+
+
+def fetch_deletions(database_url: str, since: datetime) -> List[Tuple[int, datetime]]:
+    import asyncpg
+
+    async def fetch():
+        connection = await asyncpg.connect(asyncpg_dsn(database_url))
+        try:
+            return await connection.fetch(
+                "SELECT id, deleted_at FROM knowledge_base_deletions WHERE deleted_at > $1 ORDER BY deleted_at",
+                since
+            )
+        finally:
+            await connection.close()
+
+    return [(row["id"], row["deleted_at"]) for row in asyncio.run(fetch())]
+
+
+def _recent(seen: Dict[str, str], since: datetime) -> Dict[str, str]:
+    """Entries of a {source id: timestamp} map at or after since"""
+    return {source_id: stamp for source_id, stamp in seen.items() if datetime.fromisoformat(stamp) >= since}
+
+
+def reindex_once(sink: MilvusSink, database_url: str, model_name: str, state_path: str,
+                 overlap: float, workers: int = 1, since: Optional[datetime] = None) -> Dict[str, Any]:
+    """Apply deletions and upsert changed rows; returns the new state and the affected source ids.
+
+    The watermark is moved back by `overlap` seconds on every run, so rows
+    committed late with an older last_updated are still picked up. Row
+    versions and tombstones already handled inside that window are kept in
+    the state and skipped, so re-reading the overlap only reports rows that
+    really changed.
+
+    Affected source ids are also added to state["pending_invalidation"]
+    before the checkpoint moves past them; run() clears them once their
+    cached answers are invalidated, so a failed publish is retried.
+    """
+    state = read_checkpoint(state_path) or {"source": SOURCE, "position": None, "documents": 0, "chunks": 0}
+    if since is not None:
+        state.update({"position": [since.isoformat(), 0], "deletions_watermark": since.isoformat(),
+                      "indexed": {}, "deletions_seen": {}})
+
+    epoch = datetime(1970, 1, 1)
+    position = state.get("position")
+    watermark = datetime.fromisoformat(position[0]) - timedelta(seconds=overlap) if position else epoch
+    deletions_watermark = state.get("deletions_watermark")
+    deletions_since = (datetime.fromisoformat(deletions_watermark) - timedelta(seconds=overlap)
+                       if deletions_watermark else epoch)
+    # source id -> last_updated (or deleted_at) of the version already handled
+    indexed = state.setdefault("indexed", {})
+    deletions_seen = state.setdefault("deletions_seen", {})
+    pending_invalidation = state.setdefault("pending_invalidation", [])
+
+    # Deletions first, so a row deleted and re-created since the last run ends up indexed
+    deletions = [
+        (f"kb:{row_id}", deleted_at.isoformat())
+        for row_id, deleted_at in fetch_deletions(database_url, deletions_since)
+        if deletions_seen.get(f"kb:{row_id}") != deleted_at.isoformat()
+    ]
+    deleted = [source_id for source_id, _ in deletions]
+    if deleted:
+        sink.delete_sources(deleted)
+        sink.flush()
+        deletions_seen.update(deletions)
+        pending_invalidation.extend(deleted)
+        state["deletions_watermark"] = max(
+            [stamp for _, stamp in deletions] + ([deletions_watermark] if deletions_watermark else []),
+            key=datetime.fromisoformat
+        )
+        write_checkpoint(state_path, state)
+
+    # Only recorded once ingest returns: a row is marked handled after its chunks are in Milvus
+    changed = {}
+
+    def fresh(documents):
+        for position, document in documents:
+            source_id = document["metadata"]["source_id"]
+            if indexed.get(source_id) == position[0]:
+                continue
+            changed[source_id] = position[0]
+            pending_invalidation.append(source_id)
+            yield position, document
+
+    state = ingest(fresh(iter_changed(database_url, watermark)), sink, model_name, state_path, SOURCE,
+                   workers=workers, resumed=state, replace=True)
+    # A late-committed row read from the overlap must not move the position backwards
+    if position and state.get("position"):
+        state["position"] = max(position, state["position"],
+                                key=lambda stamp: (datetime.fromisoformat(stamp[0]), stamp[1]))
+
+    # Forget versions that have fallen behind the next run's overlap window
+    state["indexed"] = _recent({**state["indexed"], **changed},
+                               datetime.fromisoformat(state["position"][0]) - timedelta(seconds=overlap)
+                               if state.get("position") else epoch)
+    if state.get("deletions_watermark"):
+        state["deletions_seen"] = _recent(
+            state["deletions_seen"],
+            datetime.fromisoformat(state["deletions_watermark"]) - timedelta(seconds=overlap)
+        )
+    state["pending_invalidation"] = sorted(set(state["pending_invalidation"]))
+    write_checkpoint(state_path, state)
+    return {"state": state, "changed": list(changed), "deleted": deleted}
+
+
+async def publish_changes(result: Dict[str, Any], args) -> int:
+    """Invalidate cached answers (and refresh the snapshot) for every pending source, then clear them"""
+    state = result["state"]
+    sources = state["pending_invalidation"]
+    if not sources:
+        return 0
+    invalidated = await answer_cache.invalidate_sources(sources)
+    if args.export_snapshot:
+        await asyncio.to_thread(export_milvus_snapshot, args.export_snapshot, args.host,
+                                args.port, args.collection)
+    state["pending_invalidation"] = []
+    write_checkpoint(args.state, state)
+    return invalidated
+
+
+async def install_triggers(database_url: str):
+    import asyncpg
+
+    connection = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        await connection.execute(TRIGGER_SQL)
+    finally:
+        await connection.close()
+
+
+async def run(args):
+    import asyncpg
+
+    sink = MilvusSink(args.host, args.port, args.collection)
+    since = datetime.fromisoformat(args.since) if args.since else None
+
+    wake = asyncio.Event()
+    listener = None
+    if not args.once:
+        listener = await asyncpg.connect(asyncpg_dsn(args.database_url))
+        await listener.add_listener(NOTIFY_CHANNEL, lambda *_: wake.set())
+
+    retry_delay = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(reindex_once, sink, args.database_url, args.model, args.state,
+                                                 args.overlap, args.workers, since)
+                since = None
+                invalidated = await publish_changes(result, args)
+            except Exception as e:
+                if args.once:
+                    raise
+                # The checkpoint only records work that finished, so the next cycle picks up the rest
+                retry_delay = min(max(2 * retry_delay, 5.0), args.interval)
+                logging.exception(f"Re-index cycle failed, retrying in {retry_delay:.0f}s: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                continue
+            retry_delay = 0.0
+
+            if result["changed"] or result["deleted"] or invalidated:
+                logging.info(f"Re-indexed {len(result['changed'])} changed and {len(result['deleted'])} "
+                             f"deleted rows, invalidated {invalidated} cached answers "
+                             f"in {time.perf_counter() - start:.1f}s")
+            else:
+                logging.info("No knowledge base changes")
+
+            if args.once:
+                break
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=args.interval)
+                # Let a burst of edits settle into a single run
+                await asyncio.sleep(args.debounce)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+    finally:
+        if listener is not None:
+            await listener.close()
+        await redis_pool.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--host", default=settings.MILVUS_HOST)
+    parser.add_argument("--port", type=int, default=settings.MILVUS_PORT)
+    parser.add_argument("--collection", default="kerala_agri_knowledge")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes")
+    parser.add_argument("--state", default="./data/reindex_state.json", help="watermark file")
+    parser.add_argument("--since", help="ISO timestamp to start from instead of the stored watermark")
+    parser.add_argument("--overlap", type=float, default=30.0, help="seconds re-read behind the watermark")
+    parser.add_argument("--interval", type=float, default=300.0, help="seconds between scheduled runs")
+    parser.add_argument("--debounce", type=float, default=5.0, help="delay after a change notification")
+    parser.add_argument("--export-snapshot", help="refresh this local index snapshot after changes")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--install-triggers", action="store_true",
+                        help="create the deletion log and change-notification triggers, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(os.path.dirname(os.path.abspath(args.state)), exist_ok=True)
+    if args.install_triggers:
+        asyncio.run(install_triggers(args.database_url))
+    else:
+        asyncio.run(run(args))
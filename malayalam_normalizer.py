@@ -0,0 +1,99 @@
+"""Single-pass Malayalam text normalization for ASR output.
+
+Spelling variants from a data file and legacy chillu sequences (consonant +
+virama + ZWJ, as written before Unicode 5.1) are compiled once into one
+regular expression shaped like a trie, so the text is scanned once however
+large the table grows. At each position the longest matching variant wins.
+"""
+
+import itertools
+import json
+import logging
+import re
+import unicodedata
+from typing import Dict, List
+
+ZWJ = "\u200d"
+VIRAMA = "\u0d4d"
+# Atomic chillu letters and the consonant they are the dead form of
+CHILLU_BASES = {
+    "\u0d7a": "\u0d23",  # ൺ
+    "\u0d7b": "\u0d28",  # ൻ
+    "\u0d7c": "\u0d30",  # ർ
+    "\u0d7d": "\u0d32",  # ൽ
+    "\u0d7e": "\u0d33",  # ൾ
+    "\u0d7f": "\u0d15",  # ൿ
+}
+CHILLU_COMPOSITION = {base + VIRAMA + ZWJ: chillu for chillu, base in CHILLU_BASES.items()}
+
+
+def trie_pattern(words: List[str]) -> str:
+    """Regex matching any of words, longest first, with shared prefixes factored out"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional: try the longer word first, fall back to the word ending here
+            pattern = f"(?:{pattern})?" if len(branches) == 1 else pattern + "?"
+        return pattern
+
+    return build(trie)
+
+
+class MalayalamNormalizer:
+    """NFC, chillu composition and spelling-variant substitution in one scan"""
+
+    def __init__(self, variants: Dict[str, str]):
+        self.table: Dict[str, str] = dict(CHILLU_COMPOSITION)
+        for variant, canonical in variants.items():
+            canonical = self._canonical(canonical)
+            # Variants must also match when the text spells their chillus the legacy way
+            for spelling in self._spellings(self._canonical(variant)):
+                self.table[spelling] = canonical
+        self.pattern = re.compile(trie_pattern(list(self.table)))
+
+    @classmethod
+    def from_file(cls, path: str) -> "MalayalamNormalizer":
+        """Load {"variants": {variant: canonical}}; a missing file leaves chillu and NFC normalization only"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                variants = json.load(f).get("variants", {})
+        except FileNotFoundError:
+            logging.warning(f"Malayalam normalization table {path} not found, using none")
+            variants = {}
+        return cls(variants)
+
+    def normalize(self, text: str) -> str:
+        # The NFC quick check is a C-level scan that returns at once for already-composed text
+        if not unicodedata.is_normalized("NFC", text):
+            text = unicodedata.normalize("NFC", text)
+        return self.pattern.sub(lambda match: self.table[match.group()], text).strip()
+
+    @staticmethod
+    def _canonical(text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        for sequence, chillu in CHILLU_COMPOSITION.items():
+            text = text.replace(sequence, chillu)
+        return text
+
+    @staticmethod
+    def _spellings(text: str) -> List[str]:
+        """text with each atomic chillu written either atomically or as consonant + virama + ZWJ"""
+        options = [
+            (char, CHILLU_BASES[char] + VIRAMA + ZWJ) if char in CHILLU_BASES else (char,)
+            for char in text
+        ]
+        return ["".join(spelling) for spelling in itertools.product(*options)]
+
+    def __len__(self):
+        return len(self.table)
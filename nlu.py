@@ -0,0 +1,154 @@
+"""Intent and entity extraction for farmer queries.
+
+Gazetteer keywords are matched in one KeywordAutomaton pass; a calibrated
+IntentClassifier, when one has been trained, overrides the keyword intent
+rules. Kept apart from the API so offline jobs can label queries without
+loading any models or clients.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Any
+
+from config import settings
+from intent_classifier import IntentClassifier
+from keyword_automaton import KeywordAutomaton
+from knowledge_index import WILDCARD_TOKENS, metadata_token
+
+
+class NLUProcessor:
+    # Built-in keywords; the gazetteer file adds to them
+    CROP_KEYWORDS = {
+        "നെൽ": "rice", "തെങ്ങ്": "coconut", "റബ്ബർ": "rubber",
+        "കുരുമുളക്": "black_pepper", "വാഴ": "banana"
+    }
+    DISEASE_KEYWORDS = {
+        "ബ്ലാസ്റ്റ്": "blast", "വാട്ടം": "wilt", "പുഴു": "pest",
+        "രോഗം": "disease", "കുത്തിയേറ്റം": "borer"
+    }
+    # Kerala's paddy seasons and monsoons, as the applicable_seasons names they correspond to
+    SEASON_KEYWORDS = {
+        "വിരിപ്പ്": "kharif", "മുണ്ടകൻ": "rabi", "പുഞ്ച": "summer", "വേനൽ": "summer",
+        "കാലവർഷം": "monsoon", "മഴക്കാലം": "monsoon", "തുലാവർഷം": "post_monsoon"
+    }
+    # Intent triggers, highest priority first
+    INTENT_TRIGGERS = {
+        "crop_disease_query": ["രോഗം", "ബ്ലാസ്റ്റ്", "വാട്ടം"],
+        "pest_control_query": ["പുഴു", "കീട"],
+        "fertilizer_query": ["വളം", "ഉര്വരം"],
+    }
+
+    def __init__(self, gazetteer_path: str = settings.NLU_GAZETTEER_PATH,
+                 classifier_path: str = settings.INTENT_CLASSIFIER_PATH):
+        self.intents = [
+            "crop_disease_query", "pest_control_query", "fertilizer_query",
+            "weather_query", "market_price_query", "government_scheme_query",
+            "planting_advice_query", "harvesting_query"
+        ]
+        keywords, self.intent_priority = self._gazetteer(gazetteer_path)
+        # Every crop, disease, pest and intent keyword in one automaton, matched in one pass per query
+        self.automaton = KeywordAutomaton(keywords)
+        logging.info(f"NLU gazetteer compiled with {len(self.automaton)} keywords")
+
+        self.classifier = None
+        if os.path.exists(classifier_path):
+            self.classifier = IntentClassifier.load(classifier_path)
+            logging.info(f"Intent classifier loaded from {classifier_path}")
+        else:
+            logging.warning(f"Intent classifier {classifier_path} not found, using keyword rules only")
+
+    def _gazetteer(self, path: str) -> tuple:
+        """(keyword, (category, value)) pairs and the intent priority order.
+
+        kerala_agriculture_data.json contributes major_crops (with their
+        seasons) and common_diseases (English and Malayalam names), plus an
+        optional "nlu_keywords" section: {"crops" | "diseases" | "pests" |
+        "season": {keyword: value}, "intents": {intent: [keyword, ...]}}.
+        """
+        entities = {
+            "crops": dict(self.CROP_KEYWORDS),
+            "diseases": dict(self.DISEASE_KEYWORDS),
+            "pests": {},
+            "season": dict(self.SEASON_KEYWORDS),
+        }
+        intents = {intent: list(triggers) for intent, triggers in self.INTENT_TRIGGERS.items()}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logging.warning(f"NLU gazetteer {path} not found, using built-in keywords only")
+            data = {}
+
+        for crop in data.get("major_crops", []):
+            for name in (crop.get("name"), crop.get("malayalam")):
+                if name:
+                    entities["crops"].setdefault(name, metadata_token(crop["name"]))
+            for season in crop.get("seasons", []):
+                # "Year-round" crops say nothing about the season a query is asking about
+                if metadata_token(season) not in WILDCARD_TOKENS:
+                    entities["season"].setdefault(season, metadata_token(season))
+        for disease in data.get("common_diseases", []):
+            for name in (disease.get("name"), disease.get("malayalam")):
+                if name:
+                    entities["diseases"].setdefault(name, metadata_token(disease["name"]))
+                    intents["crop_disease_query"].append(name)
+
+        extra = data.get("nlu_keywords", {})
+        for category in entities:
+            entities[category].update(extra.get(category, {}))
+        for intent, triggers in extra.get("intents", {}).items():
+            intents.setdefault(intent, []).extend(triggers)
+
+        keywords = [
+            (keyword, (category, value))
+            for category, mapping in entities.items() for keyword, value in mapping.items()
+        ]
+        keywords += [(trigger, ("intent", intent)) for intent, triggers in intents.items() for trigger in triggers]
+        return keywords, list(intents)
+
+    async def extract_intent_entities(self, text: str) -> Dict[str, Any]:
+        """Extract intent and entities from farmer query"""
+        return self.extract_batch([text])[0]
+
+    def extract_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Intent and entities for many queries at once, scoring the classifier over the whole batch"""
+        results = [self._match_keywords(text) for text in texts]
+
+        # A confident classifier overrides the keyword rules; its probability is calibrated
+        if self.classifier is not None and texts:
+            for result, (predicted, probability, probabilities) in zip(results, self.classifier.predict(texts)):
+                result["intent_probabilities"] = probabilities
+                if probability >= settings.INTENT_MIN_PROBABILITY:
+                    result["intent"] = predicted
+                    result["confidence"] = probability
+
+        return results
+
+    def _match_keywords(self, text: str) -> Dict[str, Any]:
+        # Gazetteer entities and keyword intent rules, all from one automaton pass
+        entities = {
+            "crops": [],
+            "diseases": [],
+            "pests": [],
+            "location": None,
+            "season": None
+        }
+
+        triggered = set()
+        for category, value in self.automaton.payloads(text):
+            if category == "intent":
+                triggered.add(value)
+            elif category == "season":
+                # One season per query; the first one mentioned
+                entities["season"] = entities["season"] or value
+            elif value not in entities[category]:
+                entities[category].append(value)
+
+        intent = next((intent for intent in self.intent_priority if intent in triggered), "general_query")
+        return {
+            "intent": intent,
+            "entities": entities,
+            "confidence": 0.85
+        }
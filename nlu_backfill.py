@@ -0,0 +1,143 @@
+"""Offline re-labelling of queries.detected_intent and queries.detected_entities.
+
+After an NLU improvement (new gazetteer terms, a retrained intent
+classifier), historical queries are re-labelled in bulk:
+
+    read     server-side cursor over queries in id order, one batch in memory
+    label    NLUProcessor.extract_batch on a pool of worker processes
+    write    COPY each labelled batch into a temp table, then one UPDATE ... FROM
+
+Batches are written in id order and the last written id is checkpointed, so
+--resume continues an interrupted run.
+
+Run with:
+    python nlu_backfill.py --workers 8 --batch-size 2000
+    python nlu_backfill.py --only-missing --resume
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Tuple
+
+import asyncpg
+
+from config import settings
+from knowledge_ingest import asyncpg_dsn, read_checkpoint, write_checkpoint
+from nlu import NLUProcessor
+
+STAGING_TABLE = "nlu_backfill_staging"
+
+# One NLUProcessor per worker process, built once
+_nlu = None
+
+
+def _init_worker():
+    global _nlu
+    _nlu = NLUProcessor()
+
+
+def _label(batch: List[Tuple[int, str]]) -> List[Tuple[int, str, str]]:
+    results = _nlu.extract_batch([text for _, text in batch])
+    return [
+        (row_id, result["intent"], json.dumps(result["entities"], ensure_ascii=False))
+        for (row_id, _), result in zip(batch, results)
+    ]
+
+
+async def write_batch(connection: asyncpg.Connection, labelled: List[Tuple[int, str, str]]):
+    """Bulk-load one batch into the staging table and apply it with a single UPDATE"""
+    async with connection.transaction():
+        await connection.copy_records_to_table(
+            STAGING_TABLE, records=labelled, columns=["id", "detected_intent", "detected_entities"]
+        )
+        await connection.execute(
+            f"UPDATE queries AS q "
+            f"SET detected_intent = s.detected_intent, detected_entities = s.detected_entities "
+            f"FROM {STAGING_TABLE} AS s WHERE q.id = s.id"
+        )
+
+
+async def backfill(database_url: str, checkpoint_path: str, workers: int, batch_size: int,
+                   only_missing: bool = False, resume: bool = False) -> Dict[str, Any]:
+    checkpoint = (read_checkpoint(checkpoint_path) if resume else None) or {"last_id": 0, "rows": 0}
+    dsn = asyncpg_dsn(database_url)
+    reader = await asyncpg.connect(dsn)
+    writer = await asyncpg.connect(dsn)
+    await writer.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+        f"(id INTEGER PRIMARY KEY, detected_intent VARCHAR(100), detected_entities JSONB) "
+        f"ON COMMIT DELETE ROWS"
+    )
+
+    query = "SELECT id, query_text FROM queries WHERE id > $1"
+    if only_missing:
+        query += " AND detected_intent IS NULL"
+    query += " ORDER BY id"
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    rows_this_run = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+            pending = deque()
+
+            async def drain(limit: int):
+                nonlocal rows_this_run
+                while len(pending) > limit:
+                    labelled = await pending.popleft()
+                    await write_batch(writer, labelled)
+
+                    rows_this_run += len(labelled)
+                    checkpoint.update({
+                        "last_id": labelled[-1][0],
+                        "rows": checkpoint["rows"] + len(labelled),
+                        "updated_at": time.time()
+                    })
+                    write_checkpoint(checkpoint_path, checkpoint)
+                    elapsed = time.perf_counter() - start
+                    logging.info(f"Re-labelled {checkpoint['rows']} rows (id {checkpoint['last_id']}), "
+                                 f"{rows_this_run / elapsed:.0f} rows/s")
+
+            # A server-side cursor needs a transaction; it streams batch_size rows per round trip
+            async with reader.transaction(readonly=True):
+                cursor = await reader.cursor(query, checkpoint["last_id"])
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    batch = [(row["id"], row["query_text"]) for row in rows]
+                    pending.append(loop.run_in_executor(executor, _label, batch))
+                    # Keep every worker busy while bounding how many batches sit in memory
+                    await drain(2 * workers)
+            await drain(0)
+    finally:
+        await reader.close()
+        await writer.close()
+
+    elapsed = time.perf_counter() - start
+    checkpoint["rows_per_second"] = rows_this_run / elapsed if elapsed else 0.0
+    write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="labelling processes")
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows per cursor fetch and UPDATE")
+    parser.add_argument("--only-missing", action="store_true", help="skip rows that already have an intent")
+    parser.add_argument("--checkpoint", default="./data/nlu_backfill_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="continue after the checkpointed id")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    os.makedirs(os.path.dirname(os.path.abspath(args.checkpoint)), exist_ok=True)
+    result = asyncio.run(backfill(args.database_url, args.checkpoint, args.workers, args.batch_size,
+                                  only_missing=args.only_missing, resume=args.resume))
+    logging.info(f"Done: {result['rows']} rows re-labelled, {result['rows_per_second']:.0f} rows/s")
@@ -220,6 +220,12 @@ kerala_agri_data = {
             "Carbendazim": {"max_concentration": "0.1%", "max_applications": 2},
             "Mancozeb": {"max_concentration": "0.25%", "max_applications": 3},
             "Copper fungicides": {"max_concentration": "0.3%", "max_applications": 3}
+        },
+        "aliases": {
+            "Endosulfan": ["എൻഡോസൾഫാൻ", "Thiodan"],
+            "Carbendazim": ["കാർബെൻഡാസിം", "Bavistin"],
+            "Mancozeb": ["മാങ്കോസെബ്", "Dithane M-45", "Indofil M-45"],
+            "Copper fungicides": ["Copper oxychloride", "കോപ്പർ ഓക്സിക്ലോറൈഡ്", "Blitox"]
         }
     }
 }
@@ -0,0 +1,63 @@
+import unicodedata
+
+import pytest
+
+from dosage_extractor import attribute, concentration_percent, extract_dosages
+
+
+def dosages(text):
+    return [(d["kind"], d["value"], d["unit"]) for d in extract_dosages(unicodedata.normalize("NFC", text))]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Carbendazim 0.5%", [("concentration", 0.5, "%")]),
+    ("0.1-0.2 ശതമാനം", [("concentration", 0.2, "%")]),
+    ("2 g per litre of water", [("rate", 2.0, "g/L")]),
+    ("Mix 5 ml per 10 litres of water", [("rate", 0.5, "ml/L")]),
+    ("10 ലിറ്റർ വെള്ളത്തിൽ 5 മില്ലി", [("rate", 0.5, "ml/L")]),
+    ("ഒരു ലിറ്റർ വെള്ളത്തിൽ 2 ഗ്രാം", [("rate", 2.0, "g/L")]),
+    ("25 kg per 2 acres", [("rate", 12.5, "kg/acre")]),
+    ("Spray 2 times", [("applications", 2.0, "times")]),
+    ("രണ്ടു തവണ തളിക്കുക", [("applications", 2.0, "times")]),
+    ("3 sprays per season", [("applications", 3.0, "times")]),
+])
+def test_recognizes_dosage_forms(text, expected):
+    assert dosages(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Spray 3 times a day",
+    "twice daily",
+    "3 times a week",
+    "ദിവസം 3 തവണ",
+    "ദിവസവും രണ്ടു തവണ",
+    "ആഴ്ചയിൽ രണ്ടു തവണ",
+    "വാരത്തിൽ മൂന്നു തവണ",
+])
+def test_frequencies_are_not_application_counts(text):
+    assert dosages(text) == []
+
+
+def test_frequency_word_does_not_hide_a_following_rate():
+    assert dosages("ദിവസം 2 ഗ്രാം ഒരു ലിറ്റർ വെള്ളത്തിൽ") == [("rate", 2.0, "g/L")]
+
+
+def test_weekly_schedule_is_not_checked_against_max_applications():
+    text = unicodedata.normalize("NFC", "Carbendazim വാരത്തിൽ മൂന്നു തവണ")
+    found = extract_dosages(text)
+    attribute(text, found, [{"chemical": "Carbendazim", "start": 0, "end": len("Carbendazim")}])
+    assert not [d for d in found if d["kind"] == "applications"]
+
+
+def test_dosage_is_attributed_to_nearest_chemical():
+    text = "Mancozeb 2 g/L. Carbendazim 1 g/L, repeat twice."
+    found = extract_dosages(text)
+    mentions = [
+        {"chemical": "Mancozeb", "start": 0, "end": 8},
+        {"chemical": "Carbendazim", "start": 16, "end": 27},
+    ]
+    attribute(text, found, mentions)
+    assert [(d["chemical"], d["kind"]) for d in found] == [
+        ("Mancozeb", "rate"), ("Carbendazim", "rate"), ("Carbendazim", "applications")
+    ]
+    assert concentration_percent(found[1]) == pytest.approx(0.1)